@@ -1,73 +1,121 @@
 # minor/nlp_backend/main.py
 
 from .file_utils import read_text_file, save_to_csv
-from .text_processing import chunk_text, extract_entities_and_relationships
-from .visualization import visualize_relationships, convert_to_table
-import spacy
+from .text_processing import iter_sentences, extract_entities_and_relationships
+from .visualization import (visualize_relationships, render_fragments, entities_page, combine_svg,
+                            SvgPageWriter, SVG_PAGE_SIZE, svg_page_path, svg_pages_index)
+from .model_registry import get_model
+from Scrapping_modules_init.record_store import RecordStore
+from itertools import islice
 import os
 
-# Load the transformer-based model
-nlp = spacy.load("en_core_web_sm")
-
-# Add necessary components to the pipeline if not already present
-if "sentencizer" not in nlp.pipe_names:
-    nlp.add_pipe("sentencizer")
-if "parser" not in nlp.pipe_names:
-    nlp.add_pipe("parser")
-
-def process_nlp(file, columns_to_save):
+NLP_MODEL = "en_core_web_sm"
+# nlp.pipe settings for the analysis pass
+NLP_BATCH_SIZE = int(os.environ.get("NLP_BATCH_SIZE", 64))
+NLP_PROCESSES = int(os.environ.get("NLP_PROCESSES", 1))
+# Entity HTML and the dependency SVG are rendered when they are requested,
+# from the stored sentences; NLP_EAGER_RENDER=1 renders both during the run
+EAGER_RENDER = os.environ.get("NLP_EAGER_RENDER", "0") == "1"
+# Sentences rendered per request at most
+RENDER_PAGE_SIZE = int(os.environ.get("RENDER_PAGE_SIZE", 50))
+
+def setup_pipeline(nlp):
+    # Add necessary components to the pipeline if not already present
+    if "sentencizer" not in nlp.pipe_names:
+        nlp.add_pipe("sentencizer")
+    if "parser" not in nlp.pipe_names:
+        nlp.add_pipe("parser")
+
+def process_nlp(file, columns_to_save, csv_filename="structured_data.csv",
+                svg_filename="relationships.svg", html_filename="entities_all_chunks.html"):
     if not os.path.exists(file):
         raise FileNotFoundError(f"File {file} not found.")
-    
-    text = read_text_file(file)  # Update to read from file object
-    chunks = chunk_text(text, nlp)
-    structured_data = extract_entities_and_relationships(chunks, nlp)
-
-    # Collect all docs for visualization
-    docs = [nlp(chunk) for chunk in chunks]
-
-    # Visualize all relationships in a single SVG
-    visualize_relationships(docs)
 
-    table = convert_to_table(structured_data)
+    text = read_text_file(file)  # Update to read from file object
+    # Nothing renders these later for a standalone run, so render them now
+    return process_nlp_stream(text.splitlines(), columns_to_save, csv_filename,
+                              svg_filename, html_filename, eager_render=True)
+
+def process_nlp_stream(lines, columns_to_save, csv_filename="structured_data.csv",
+                       svg_filename="relationships.svg", html_filename="entities_all_chunks.html",
+                       batch_size=NLP_BATCH_SIZE, on_row=None, stats=None,
+                       sentences_filename=None, eager_render=EAGER_RENDER, table_filename=None):
+    # `lines` can be any iterable of passages, e.g. a generator fed by the
+    # scraper; they are parsed batch by batch as they arrive
+    # Shared pipeline, loaded once per worker by the model registry
+    nlp = get_model(NLP_MODEL, setup=setup_pipeline)
+
+    # Parse once; sentences are stored for rendering on request, and only
+    # kept in memory when the visualizations are rendered right away
+    store = RecordStore(sentences_filename) if sentences_filename else None
+    sentences = []
+    def analyzed():
+        for sent in iter_sentences(lines, nlp, batch_size=batch_size, n_process=NLP_PROCESSES):
+            if store is not None:
+                store.append({"text": sent.text})
+            if eager_render:
+                sentences.append(sent)
+            yield sent
+    try:
+        structured_data = extract_entities_and_relationships(analyzed(), batch_size=batch_size,
+                                                             on_row=on_row, stats=stats)
+    finally:
+        if store is not None:
+            store.close()
+
+    if eager_render:
+        with open(html_filename, "w", encoding="utf-8") as html_file:
+            html_file.write(entities_page(render_fragments(sentences, "ent"), nlp.lang))
+        # Visualize all relationships in SVG pages next to svg_filename
+        visualize_relationships(sentences, svg_filename)
+
+    # Built straight from the accumulated entity arrays
+    table = structured_data.to_frame()
 
     # Specify the columns to save
     # columns_to_save = ["Person", "Org", "Date", "Loc","Money","Quantity", "Relationships"]
-    csv_filename = "structured_data.csv"
     save_to_csv(table, csv_filename, columns_to_save)
-
-    return "relationships.svg", csv_filename  # Return paths to SVG and CSV files
-
-# from file_utils import read_text_file, save_to_csv
-# from text_processing import chunk_text, extract_entities_and_relationships
-# from visualization import visualize_relationships, convert_to_table
-# import spacy
-
-# # Load the transformer-based model
-# nlp = spacy.load("en_core_web_trf")
-
-# # Add the sentencizer and dependency parser components to the pipeline
-# if "sentencizer" not in nlp.pipe_names:
-#     nlp.add_pipe("sentencizer")
-# if "parser" not in nlp.pipe_names:
-#     nlp.add_pipe("parser")
-
-# file_path = "/Users/srishti/Desktop/Server/Minor/NLP_backend/sample1.txt"
-
-# text = read_text_file(file_path)
-# chunks = chunk_text(text, nlp)
-# structured_data = extract_entities_and_relationships(chunks, nlp)
-
-# # Collect all docs for visualization
-# docs = [nlp(chunk) for chunk in chunks]
-
-# # Visualize all relationships in a single SVG
-# visualize_relationships(docs)
-
-# table = convert_to_table(structured_data)
-
-# print(table)
-
-# # Specify the columns to save
-# columns_to_save = ["Person", "Org", "Date", "Loc", "Relationships"]
-# save_to_csv(table, "structured_data.csv", columns_to_save)
+    # Every column as well, for callers that project other columns later
+    if table_filename:
+        save_to_csv(table, table_filename, list(table.columns))
+
+    return svg_filename, csv_filename  # Return paths to SVG and CSV files
+
+def read_sentences(sentences_filename, start=0, count=None):
+    # Sentences start..start+count stored by process_nlp_stream, and the total;
+    # safe to call while the run is still writing them
+    store = RecordStore(sentences_filename, readonly=True)
+    try:
+        records = store.iter_records(start)
+        if count is not None:
+            records = islice(records, count)
+        return [record["text"] for record in records], len(store)
+    finally:
+        store.close()
+
+def render_sentences(sentences_filename, style, start=0, count=RENDER_PAGE_SIZE):
+    # Entity HTML page or dependency SVG for a range of stored sentences;
+    # only sentences without a cached fragment are parsed and rendered
+    texts, total = read_sentences(sentences_filename, start, count)
+    nlp = get_model(NLP_MODEL, setup=setup_pipeline)
+    fragments = render_fragments(texts, style, nlp)
+    if style == "ent":
+        return entities_page(fragments, nlp.lang), total
+    return combine_svg(fragments), total
+
+def render_svg_page(sentences_filename, svg_filename, page, page_size=SVG_PAGE_SIZE):
+    # One page of the relationships SVG, rendered the first time it is
+    # requested; None if the run has fewer pages
+    texts, _ = read_sentences(sentences_filename, (page - 1) * page_size, page_size)
+    if not texts:
+        return None
+    nlp = get_model(NLP_MODEL, setup=setup_pipeline)
+    writer = SvgPageWriter(svg_filename, page_size, first_page=page, write_index=False)
+    for fragment in render_fragments(texts, "dep", nlp):
+        writer.add(fragment)
+    writer.close()
+    return svg_page_path(svg_filename, page)
+
+def svg_index(sentences_filename, svg_filename, page_size=SVG_PAGE_SIZE):
+    # The page index, from the number of stored sentences
+    return svg_pages_index(svg_filename, len(RecordStore(sentences_filename, readonly=True)), page_size)
@@ -0,0 +1,136 @@
+# minor/nlp_backend/model_registry.py
+
+from itertools import islice
+import sys
+import threading
+import time
+import spacy
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, fall back to the resource module
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def _memory_usage():
+    # Current RSS in bytes if psutil is installed, otherwise the peak RSS
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return usage if sys.platform == "darwin" else usage * 1024
+    return None
+
+
+class ModelHandle:
+    """Shared handle to a loaded pipeline.
+
+    Calls into the pipeline are serialized with a lock, since a spaCy
+    Language object mutates its vocab/string store while processing and
+    is not guaranteed to be thread-safe.
+    """
+
+    def __init__(self, name, nlp):
+        self.name = name
+        self.nlp = nlp
+        self.lock = threading.RLock()
+
+    def __call__(self, text, **kwargs):
+        with self.lock:
+            return self.nlp(text, **kwargs)
+
+    def pipe(self, texts, batch_size=64, n_process=1, **kwargs):
+        if n_process != 1:
+            # Worker processes get their own copy; hold the lock for the run
+            with self.lock:
+                yield from self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process, **kwargs)
+            return
+        # Lock one batch at a time, so a slow producer feeding the stream
+        # doesn't keep other callers off the pipeline
+        texts = iter(texts)
+        while True:
+            batch = list(islice(texts, batch_size))
+            if not batch:
+                return
+            with self.lock:
+                docs = list(self.nlp.pipe(batch, batch_size=batch_size, **kwargs))
+            yield from docs
+
+    def __getattr__(self, attr):
+        # vocab, pipe_names, make_doc, ... are read straight from the pipeline
+        return getattr(self.nlp, attr)
+
+
+class ModelRegistry:
+    """Loads each named pipeline once per worker process and hands out handles."""
+
+    def __init__(self):
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def _key(self, name, load_kwargs):
+        return (name,) + tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                                      for k, v in load_kwargs.items()))
+
+    def get(self, name, setup=None, **load_kwargs):
+        """Return the shared handle for `name`, loading it on first use.
+
+        `setup` is called once with the freshly loaded pipeline, e.g. to add
+        pipes. Extra keyword arguments are passed to spacy.load and are part
+        of the cache key, so the same model loaded with different `exclude`
+        lists gets separate entries.
+        """
+        key = self._key(name, load_kwargs)
+        handle = self._models.get(key)
+        if handle is not None:
+            self._stats[key]["requests"] += 1
+            return handle
+
+        with self._registry_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            # Another thread may have finished loading while we waited
+            handle = self._models.get(key)
+            if handle is None:
+                mem_before = _memory_usage()
+                start = time.perf_counter()
+                nlp = spacy.load(name, **load_kwargs)
+                if setup is not None:
+                    setup(nlp)
+                load_seconds = time.perf_counter() - start
+                mem_after = _memory_usage()
+
+                handle = ModelHandle(name, nlp)
+                self._stats[key] = {
+                    "name": name,
+                    "options": dict(load_kwargs),
+                    "pipe_names": list(nlp.pipe_names),
+                    "load_seconds": round(load_seconds, 3),
+                    "memory_bytes": (mem_after - mem_before
+                                     if mem_before is not None else None),
+                    "requests": 0,
+                }
+                self._models[key] = handle
+                print(f"Loaded {name} in {load_seconds:.2f}s")
+            self._stats[key]["requests"] += 1
+            return handle
+
+    def stats(self):
+        return [dict(stat) for stat in self._stats.values()]
+
+
+# One registry per worker process
+registry = ModelRegistry()
+
+
+def get_model(name, setup=None, **load_kwargs):
+    return registry.get(name, setup=setup, **load_kwargs)
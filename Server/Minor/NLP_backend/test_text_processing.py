@@ -0,0 +1,122 @@
+import random
+import unittest
+
+import pandas as pd
+import spacy
+from spacy.tokens import Doc
+
+from text_processing import (ENTITY_COLUMNS, ENTITY_LABELS, TABLE_COLUMNS, RelationshipExtractor,
+                             batch_relationships, extract_entities_and_relationships)
+
+DEPS = ["det", "amod", "prep", "punct", "compound", "advmod", "aux", "cc", "conj",
+        "nsubj", "dobj", "pobj", "iobj"]
+# Labels with a column of their own, and some that go to Misc
+LABELS = list(ENTITY_LABELS) + ["NORP", "EVENT", "LAW"]
+
+nlp = spacy.blank("en")
+
+
+def random_doc(rng, sentences=4):
+    # A parsed Doc of random dependency trees, one per sentence, with random entities
+    words, heads, deps, starts, ents = [], [], [], [], []
+    for _ in range(sentences):
+        base, size = len(words), rng.randint(2, 20)
+        root = base + rng.randrange(size)
+        head_of = {root: root}
+        placed = [root]
+        for i in rng.sample(range(base, base + size), size):
+            if i != root:
+                head_of[i] = rng.choice(placed)
+                placed.append(i)
+        for i in range(base, base + size):
+            words.append(f"w{i}" if rng.random() < 0.7 else rng.choice(["Apple", "Tim", "2023"]))
+            heads.append(head_of[i])
+            deps.append("ROOT" if i == root else rng.choice(DEPS))
+            starts.append(i == base)
+        i = base
+        while i < base + size:
+            length = min(rng.randint(1, 3), base + size - i)
+            if rng.random() < 0.3:
+                label = rng.choice(LABELS)
+                ents.extend([f"B-{label}"] + [f"I-{label}"] * (length - 1))
+                i += length
+            else:
+                ents.append("O")
+                i += 1
+    spaces = [rng.random() < 0.8 for _ in words]
+    return Doc(nlp.vocab, words=words, spaces=spaces, heads=heads, deps=deps,
+               sent_starts=starts, ents=ents)
+
+
+def token_loop_relationships(doc):
+    # The original extract_relationships token loop
+    relationships = []
+    for token in doc:
+        if token.dep_ in ("nsubj", "dobj", "pobj", "iobj"):
+            subject = [w for w in token.head.lefts if w.dep_ == "nsubj"]
+            if subject:
+                subject = subject[0]
+                relationships.append((subject.text, token.head.text, token.text))
+    return relationships
+
+
+def dict_rows_frame(docs):
+    # The table as rows used to be built: one dict of lists per row, a new
+    # row whenever a doc has values in a column the current row has
+    rows = []
+    current = {name: [] for name in TABLE_COLUMNS}
+    for doc in docs:
+        entities = {name: [] for name in TABLE_COLUMNS}
+        for ent in doc.ents:
+            entities[ENTITY_LABELS.get(ent.label_, "Misc")].append(ent.text)
+        entities["Relationships"] = token_loop_relationships(doc)
+        if any(current[key] and entities[key] for key in entities):
+            rows.append(current)
+            current = entities
+        else:
+            for key in entities:
+                current[key].extend(entities[key])
+    if any(current.values()):
+        rows.append(current)
+    table = [dict({name: ", ".join(row[name]) for name in ENTITY_COLUMNS},
+                  Relationships="; ".join(f"{rel[0]} -> {rel[1]} -> {rel[2]}" for rel in row["Relationships"]))
+             for row in rows]
+    return pd.DataFrame(table, columns=TABLE_COLUMNS)
+
+
+class EntityTableTest(unittest.TestCase):
+    def test_matches_dict_of_lists_grouping(self):
+        rng = random.Random(0)
+        docs = [random_doc(rng) for _ in range(300)]
+        sentences = [sent for doc in docs for sent in doc.sents]
+        for chunks in (docs, sentences):
+            expected = dict_rows_frame(chunks)
+            table = extract_entities_and_relationships(chunks, batch_size=7)
+            self.assertEqual(len(table), len(expected))
+            pd.testing.assert_frame_equal(table.to_frame(), expected, check_dtype=False)
+            self.assertEqual(table[3]["Person"], [t for t in expected.loc[3, "Person"].split(", ") if t])
+
+
+class RelationshipTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        self.docs = [random_doc(rng, sentences=5) for _ in range(2000)]
+
+    def test_batch_matches_token_loop(self):
+        for start in range(0, len(self.docs), 100):
+            batch = self.docs[start:start + 100] + [nlp("")]
+            for doc, relationships in zip(batch, batch_relationships(batch)):
+                self.assertEqual([rel[:3] for rel in relationships], token_loop_relationships(doc))
+                for rel in relationships:
+                    self.assertEqual((doc[rel.subject_i].text, doc[rel.verb_i].text, doc[rel.object_i].text),
+                                     rel[:3])
+
+    def test_pipe_matches_token_loop_per_sentence(self):
+        sentences = [sent for doc in self.docs for sent in doc.sents]
+        found = RelationshipExtractor(batch_size=7).pipe(sentences)
+        for sent, relationships in zip(sentences, found):
+            self.assertEqual([rel[:3] for rel in relationships], token_loop_relationships(sent))
+
+
+if __name__ == "__main__":
+    unittest.main()
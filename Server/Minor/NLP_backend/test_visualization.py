@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from visualization import (SVG_SPACING, SvgPageWriter, fragment_size, svg_index_path, svg_page_path,
+                           svg_pages_index)
+
+
+def fragment(i):
+    # A displacy-like dependency fragment of its own size
+    return f'<svg xmlns="http://www.w3.org/2000/svg" width="{100 + i * 10}" height="{50 + i}"><text>{i}</text></svg>'
+
+
+class SvgPageWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "relationships.svg")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pages_sizes_and_index(self):
+        writer = SvgPageWriter(self.path, page_size=3)
+        for i in range(7):
+            writer.add(fragment(i))
+        pages = writer.close()
+
+        self.assertEqual([(page["page"], page["first_sentence"], page["sentences"]) for page in pages],
+                         [(1, 0, 3), (2, 3, 3), (3, 6, 1)])
+        for page in pages:
+            sentences = range(page["first_sentence"], page["first_sentence"] + page["sentences"])
+            self.assertEqual(page["width"], max(100 + i * 10 for i in sentences))
+            self.assertEqual(page["height"], sum(50 + i + SVG_SPACING for i in sentences))
+            with open(svg_page_path(self.path, page["page"]), encoding="utf-8") as file:
+                svg = file.read()
+            # The placeholder header was patched with the page's real size
+            self.assertEqual(fragment_size(svg), (page["width"], page["height"]))
+            self.assertTrue(svg.endswith("</svg>"))
+            self.assertEqual(svg.count("<text>"), page["sentences"])
+
+            # Fragments are stacked at their real heights
+            y = 0
+            for i in sentences:
+                self.assertIn(f'<svg y="{y:g}" xmlns', svg)
+                y += 50 + i + SVG_SPACING
+
+        with open(svg_index_path(self.path), encoding="utf-8") as file:
+            index = json.load(file)
+        self.assertEqual(index, {"sentences": 7, "page_size": 3, "pages": pages})
+        expected = svg_pages_index(self.path, 7, page_size=3)
+        self.assertEqual([{key: page[key] for key in expected["pages"][0]} for page in pages], expected["pages"])
+        self.assertEqual(sorted(os.listdir(self.dir)), ["relationships.json", "relationships_page1.svg",
+                                                        "relationships_page2.svg", "relationships_page3.svg"])
+
+    def test_later_page_on_its_own(self):
+        writer = SvgPageWriter(self.path, page_size=3, first_page=2, write_index=False)
+        for i in range(3, 6):
+            writer.add(fragment(i))
+        pages = writer.close()
+        self.assertEqual([(page["page"], page["first_sentence"], page["sentences"]) for page in pages], [(2, 3, 3)])
+        self.assertEqual(os.listdir(self.dir), ["relationships_page2.svg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,113 +1,353 @@
-from spacy import displacy
+from spacy.attrs import DEP, ENT_IOB, ENT_TYPE, HEAD, ORTH, SPACY
+from spacy.strings import get_string_id
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import chain, tee
+import numpy as np
+import pandas as pd
+import time
+
+DEFAULT_BATCH_SIZE = 64
+
+def iter_sentences(lines, nlp, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+    # Streams passages (one per line) through nlp.pipe in batches and yields
+    # the sentence spans of each parsed passage
+    lines = (line for line in lines if line.strip())
+    for doc in nlp.pipe(lines, batch_size=batch_size, n_process=n_process):
+        for sent in doc.sents:
+            print(f"Chunk: {sent.text}")  # Print each chunk
+            yield sent
+
+def analyze_text(text, nlp, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+    # Single analysis pass: parse the text once and keep the sentence spans,
+    # so NER, relationships and both visualizations read the same parse.
+    # The input has one passage per line, so the lines are streamed through
+    # nlp.pipe in batches instead of being parsed as one huge Doc.
+    return list(iter_sentences(text.splitlines(), nlp, batch_size, n_process))
 
 def chunk_text(text, nlp):
-    doc = nlp(text)
-    chunks = []
-    for sent in doc.sents:
-        chunks.append(sent.text)
-        print(f"Chunk: {sent.text}")  # Print each chunk
-    return chunks
-
-def extract_entities_and_relationships(text_chunks, nlp):
-    structured_data = []
-    all_html = ""
-    current_row = {
-        "Person": [],
-        "Org": [],
-        "Date": [],
-        "Loc": [],
-        "Misc": [],
-        "Money": [],
-        "Percent": [],
-        "Time": [],
-        "Quantity": [],
-        "Ordinal": [],
-        "Cardinal": [],
-        "Product": [],
-        "Relationships": []
-    }
-
-    for i, chunk in enumerate(text_chunks):
-        doc = nlp(chunk)
-        entities = {
-            "Person": [],
-            "Org": [],
-            "Date": [],
-            "Loc": [],
-            "Misc": [],
-            "Money": [],
-            "Percent": [],
-            "Time": [],
-            "Quantity": [],
-            "Ordinal": [],
-            "Cardinal": [],
-            "Product": [],
-        }
-        for ent in doc.ents:  # Named Entity Recognition
-            entity_info = ent.text
-            if ent.label_ == "PERSON":
-                entities["Person"].append(entity_info)
-            elif ent.label_ == "ORG":
-                entities["Org"].append(entity_info)
-            elif ent.label_ == "DATE":
-                entities["Date"].append(entity_info)
-            elif ent.label_ == "GPE":
-                entities["Loc"].append(entity_info)
-            elif ent.label_ == "MONEY":
-                entities["Money"].append(entity_info)
-            elif ent.label_ == "PERCENT":
-                entities["Percent"].append(entity_info)
-            elif ent.label_ == "TIME":
-                entities["Time"].append(entity_info)
-            elif ent.label_ == "QUANTITY":
-                entities["Quantity"].append(entity_info)
-            elif ent.label_ == "ORDINAL":
-                entities["Ordinal"].append(entity_info)
-            elif ent.label_ == "CARDINAL":
-                entities["Cardinal"].append(entity_info)
-            elif ent.label_ == "PRODUCT":
-                entities["Product"].append(entity_info)
-            else:
-                entities["Misc"].append(entity_info)
-
-        # Extract relationships
-        relationships = extract_relationships(doc)
-        entities["Relationships"] = relationships
-
-        # Check for conflicts and add to structured_data
-        conflict = False
-        for key in entities:
-            if current_row[key] and entities[key]:
-                conflict = True
-                break
-
-        if conflict:
-            structured_data.append(current_row)
-            current_row = entities
+    return [sent.text for sent in analyze_text(text, nlp)]
+
+def iter_docs(text_chunks, nlp=None, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+    # Raw strings are streamed through nlp.pipe; chunks that are already
+    # parsed (Doc or sentence Span) are passed through untouched
+    chunks = iter(text_chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    chunks = chain([first], chunks)
+    if isinstance(first, str):
+        yield from nlp.pipe(chunks, batch_size=batch_size, n_process=n_process)
+    else:
+        yield from chunks
+
+# Table columns, in CSV order; entity labels without a column of their own go to Misc
+ENTITY_COLUMNS = ["Person", "Org", "Date", "Loc", "Misc", "Money", "Percent", "Time",
+                  "Quantity", "Ordinal", "Cardinal", "Product"]
+RELATIONSHIPS = len(ENTITY_COLUMNS)
+TABLE_COLUMNS = ENTITY_COLUMNS + ["Relationships"]
+ENTITY_LABELS = {"PERSON": "Person", "ORG": "Org", "DATE": "Date", "GPE": "Loc",
+                 "MONEY": "Money", "PERCENT": "Percent", "TIME": "Time", "QUANTITY": "Quantity",
+                 "ORDINAL": "Ordinal", "CARDINAL": "Cardinal", "PRODUCT": "Product"}
+MISC = ENTITY_COLUMNS.index("Misc")
+
+# Label ID -> column number lookup table, as two sorted arrays for searchsorted
+_label_ids = np.array(sorted(get_string_id(label) for label in ENTITY_LABELS), dtype=np.uint64)
+_label_columns = np.array([ENTITY_COLUMNS.index(ENTITY_LABELS[label])
+                           for label in sorted(ENTITY_LABELS, key=get_string_id)], dtype=np.uint8)
+
+def label_columns(label_ids):
+    # Column number for each entity label ID
+    positions = np.minimum(np.searchsorted(_label_ids, label_ids), len(_label_ids) - 1)
+    return np.where(_label_ids[positions] == label_ids, _label_columns[positions], MISC).astype(np.uint8)
+
+def doc_entities(doc):
+    # Token start/end, column and text of every entity in a Doc (the same
+    # spans as doc.ents), read from its token arrays in one call
+    if not len(doc):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty.astype(np.uint8), []
+    attrs = doc.to_array([ENT_IOB, ENT_TYPE, ORTH, SPACY])
+    iob, labels = attrs[:, 0].astype(np.int64), attrs[:, 1]
+    starts = np.flatnonzero((iob == 3) & (labels != 0))
+    # An entity runs until the first token that does not continue it (IOB "I")
+    boundaries = np.append(np.flatnonzero(iob != 1), len(doc))
+    ends = boundaries[np.searchsorted(boundaries, starts, side="right")]
+    columns = label_columns(labels[starts])
+
+    # Entity texts from the token strings, without building Token objects
+    strings = doc.vocab.strings
+    orths = attrs[:, 2].tolist()
+    spaces = attrs[:, 3].tolist()
+    texts = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if end - start == 1:
+            texts.append(strings[orths[start]])
         else:
-            for key in entities:
-                current_row[key].extend(entities[key])
+            texts.append("".join(strings[orths[i]] + (" " if spaces[i] else "")
+                                 for i in range(start, end - 1)) + strings[orths[end - 1]])
+    return starts, ends, columns, texts
+
+class EntityTable:
+    """Entity rows accumulated column-wise.
+
+    Each entity is stored once, as its row number, column number and text
+    in flat arrays; the comma-joined table is built from those at the end.
+    Rows are grouped as before: a doc starts a new row when it has entities
+    (or relationships) in a column the current row already has.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._row_mask = 0  # columns the current (last) row has values in
+        self._entity_rows = array("I")
+        self._entity_columns = array("B")
+        self._entity_texts = []
+        self._relationship_rows = array("I")
+        self._relationships = []
+        self._doc = None
+        self._doc_entities = None
+        self._extractor = RelationshipExtractor()
+
+    def _entities(self, doc):
+        # Entities of a Doc or sentence Span; sentences of one Doc share its arrays
+        parent = doc.doc
+        if parent is not self._doc:
+            self._doc = parent
+            self._doc_entities = doc_entities(parent)
+        starts, ends, columns, texts = self._doc_entities
+        if parent is doc:
+            return columns, texts
+        # Entities completely inside the span, as Span.ents selects them
+        first = np.searchsorted(starts, doc.start)
+        last = np.searchsorted(ends, doc.end, side="right")
+        return columns[first:last], texts[first:last]
+
+    def add(self, doc, relationships=None):
+        # Returns the number of the row this doc completed, or None.
+        # `relationships` are the doc's, if they were extracted in batch
+        columns, texts = self._entities(doc)
+        if relationships is None:
+            relationships = self._extractor(doc)
+        mask = int(np.bitwise_or.reduce(np.left_shift(1, columns, dtype=np.int64))) if len(columns) else 0
+        if relationships:
+            mask |= 1 << RELATIONSHIPS
+
+        completed = None
+        if self._row_mask & mask:
+            completed = self.rows - 1
+            self._row_mask = 0
+        if mask and not self._row_mask:
+            self.rows += 1
+        self._row_mask |= mask
+
+        row = self.rows - 1
+        self._entity_rows.extend([row] * len(columns))
+        self._entity_columns.extend(columns.tolist())
+        self._entity_texts.extend(texts)
+        self._relationship_rows.extend([row] * len(relationships))
+        self._relationships.extend(relationships)
+        return completed
+
+    def finish(self):
+        # Number of the last row, or None if there is none
+        return self.rows - 1 if self._row_mask else None
+
+    def _grouped(self, rows, values, separator):
+        # One joined string per row for values grouped by (already sorted) row
+        column = np.full(self.rows, "", dtype=object)
+        if len(rows):
+            breaks = np.flatnonzero(np.diff(rows)) + 1
+            for group_start, group_end in zip(np.append(0, breaks).tolist(), np.append(breaks, len(rows)).tolist()):
+                column[rows[group_start]] = separator.join(values[group_start:group_end])
+        return column
+
+    def to_frame(self):
+        rows = np.frombuffer(self._entity_rows, dtype=np.uint32)
+        columns = np.frombuffer(self._entity_columns, dtype=np.uint8)
+        # Stable sort by column, then row, keeps entities in document order
+        order = np.lexsort((rows, columns))
+        rows = rows[order]
+        texts = [self._entity_texts[i] for i in order.tolist()]
+        column_bounds = np.searchsorted(columns[order], np.arange(len(ENTITY_COLUMNS) + 1))
+
+        table = {}
+        for i, name in enumerate(ENTITY_COLUMNS):
+            lo, hi = column_bounds[i], column_bounds[i + 1]
+            table[name] = self._grouped(rows[lo:hi], texts[lo:hi], ", ")
+        relationships = [f"{rel[0]} -> {rel[1]} -> {rel[2]}" for rel in self._relationships]
+        table["Relationships"] = self._grouped(np.frombuffer(self._relationship_rows, dtype=np.uint32),
+                                               relationships, "; ")
+        return pd.DataFrame(table, columns=TABLE_COLUMNS)
 
-        # Visualize entities using displacy and concatenate HTML
-        html = displacy.render(doc, style="ent", page=True)
-        all_html += html
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        # One row as a dict of lists, the shape rows used to be built in
+        if not -self.rows <= row < self.rows:
+            raise IndexError(row)
+        row %= self.rows
+        entry = {name: [] for name in TABLE_COLUMNS}
+        for entity_row, column, text in zip(self._entity_rows, self._entity_columns, self._entity_texts):
+            if entity_row == row:
+                entry[ENTITY_COLUMNS[column]].append(text)
+        entry["Relationships"] = [rel for rel_row, rel in zip(self._relationship_rows, self._relationships)
+                                  if rel_row == row]
+        return entry
+
+def iter_entity_rows(docs, table, batch_size=DEFAULT_BATCH_SIZE):
+    # Adds consecutive docs to the table and yields the number of each row
+    # as soon as it is complete, so rows can stream out while docs stream in
+    # (entity markup is rendered separately, see visualization.render_fragments).
+    # Relationships are extracted for batch_size parent Docs at a time
+    docs, batch_docs = tee(docs)
+    for doc, relationships in zip(docs, RelationshipExtractor(batch_size).pipe(batch_docs)):
+        completed = table.add(doc, relationships)
+        if completed is not None:
+            yield completed
 
     # Add the last row
-    if any(current_row.values()):
-        structured_data.append(current_row)
+    last = table.finish()
+    if last is not None:
+        yield last
+
+def extract_entities_and_relationships(text_chunks, nlp=None, batch_size=DEFAULT_BATCH_SIZE,
+                                       n_process=1, stats=None, on_row=None):
+    start_time = time.perf_counter()
+    sentence_count = 0
+    structured_data = EntityTable()
+
+    def counted(docs):
+        nonlocal sentence_count
+        for doc in docs:
+            sentence_count += 1
+            yield doc
+
+    # Docs arrive in input order, so the sequential current_row grouping
+    # behaves exactly as with one nlp() call per chunk.
+    docs = counted(iter_docs(text_chunks, nlp, batch_size, n_process))
+    for row in iter_entity_rows(docs, structured_data, batch_size):
+        if on_row is not None:
+            on_row(row)
 
-    # Save all visualizations to a single HTML file
-    with open("entities_all_chunks.html", "w", encoding="utf-8") as file:
-        file.write(all_html)
+    elapsed = time.perf_counter() - start_time
+    throughput = sentence_count / elapsed if elapsed > 0 else 0.0
+    print(f"Extracted entities from {sentence_count} sentences in {elapsed:.2f}s "
+          f"({throughput:.1f} sentences/sec)")
+    if stats is not None:
+        stats.update({
+            "sentences": sentence_count,
+            "seconds": round(elapsed, 3),
+            "sentences_per_sec": round(throughput, 1),
+        })
 
     return structured_data
 
+# Relationship patterns: a token with one of these dependencies, its head
+# (the verb), and the head's first nsubj child to its left (the subject).
+# "nsubj" pairs the subject with itself and with any later nsubj sibling,
+# as the original token loop did.
+RELATION_TYPES = {"nsubj": "subject", "dobj": "object", "pobj": "prep_object", "iobj": "indirect_object"}
+_NSUBJ = get_string_id("nsubj")
+_relation_dep_ids = np.array(sorted(get_string_id(dep) for dep in RELATION_TYPES), dtype=np.uint64)
+_relation_names = [RELATION_TYPES[dep] for dep in sorted(RELATION_TYPES, key=get_string_id)]
+
+# Token offsets are indices into the parent Doc
+Relationship = namedtuple("Relationship", ["subject", "verb", "object", "relation",
+                                           "subject_i", "verb_i", "object_i"])
+
+def batch_relationships(docs):
+    # Relationships of each Doc, ordered by object token. The docs' head and
+    # dependency arrays are concatenated and matched in one vectorized pass,
+    # so the cost per Doc is a to_array call rather than a loop over tokens
+    docs = list(docs)
+    lengths = [len(doc) for doc in docs]
+    offsets = np.cumsum([0] + lengths)
+    total = int(offsets[-1])
+    if not total:
+        return [[] for _ in docs]
+    attrs = np.concatenate([doc.to_array([HEAD, DEP, ORTH]) for doc in docs if len(doc)])
+    deps = attrs[:, 1]
+    positions = np.arange(total)
+    heads = positions + attrs[:, 0].astype(np.int64)  # HEAD is a relative offset
+
+    # First nsubj child to the left of each head (total if there is none)
+    subjects = np.flatnonzero((deps == _NSUBJ) & (positions < heads))
+    subject_of = np.full(total, total, dtype=np.int64)
+    np.minimum.at(subject_of, heads[subjects], subjects)
+
+    kinds = np.minimum(np.searchsorted(_relation_dep_ids, deps), len(_relation_dep_ids) - 1)
+    objects = np.flatnonzero(_relation_dep_ids[kinds] == deps)
+    verbs = heads[objects]
+    found = subject_of[verbs] < total
+    objects, verbs = objects[found], verbs[found]
+    subjects = subject_of[verbs]
+    names = [_relation_names[kind] for kind in kinds[objects].tolist()]
+
+    strings = docs[0].vocab.strings
+    orths = attrs[:, 2]
+    texts = [[strings[orth] for orth in orths[tokens].tolist()] for tokens in (subjects, verbs, objects)]
+    # Token offsets relative to each relationship's own Doc
+    bounds = np.searchsorted(objects, offsets)
+    doc_offsets = np.repeat(offsets[:-1], np.diff(bounds))
+    relationships = list(map(Relationship._make, zip(*texts, names, (subjects - doc_offsets).tolist(),
+                                                      (verbs - doc_offsets).tolist(),
+                                                      (objects - doc_offsets).tolist())))
+    bounds = bounds.tolist()
+    return [relationships[bounds[i]:bounds[i + 1]] for i in range(len(docs))]
+
+def doc_relationships(doc):
+    return batch_relationships([doc])[0]
+
+class RelationshipExtractor:
+    """Relationships of Docs or sentence Spans, in batch.
+
+    Parent Docs are matched together, a batch at a time, each one once;
+    its sentences then take the relationships whose object token they
+    contain.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._relationships = {}
+
+    def _slice(self, doc):
+        relationships, objects = self._relationships[id(doc.doc)][1:]
+        if doc.doc is doc:
+            return list(relationships)
+        return relationships[bisect_left(objects, doc.start):bisect_left(objects, doc.end)]
+
+    def _match(self, parents):
+        self._relationships = {}
+        for parent, relationships in zip(parents, batch_relationships(parents)):
+            # The Doc is kept so its id cannot be reused while it is cached
+            self._relationships[id(parent)] = (parent, relationships, [rel.object_i for rel in relationships])
+
+    def __call__(self, doc):
+        if id(doc.doc) not in self._relationships:
+            self._match([doc.doc])
+        return self._slice(doc)
+
+    def pipe(self, docs):
+        # Relationship lists in input order, matching up to batch_size parent Docs at once
+        batch = []
+        parents = {}
+        for doc in docs:
+            if id(doc.doc) not in parents and len(parents) == self.batch_size:
+                self._match(list(parents.values()))
+                for batched in batch:
+                    yield self._slice(batched)
+                batch = []
+                parents = {}
+            batch.append(doc)
+            parents[id(doc.doc)] = doc.doc
+        if batch:
+            self._match(list(parents.values()))
+            for batched in batch:
+                yield self._slice(batched)
+
 def extract_relationships(doc):
-    relationships = []
-    for token in doc:
-        if token.dep_ in ("nsubj", "dobj", "pobj", "iobj"):
-            subject = [w for w in token.head.lefts if w.dep_ == "nsubj"]
-            if subject:
-                subject = subject[0]
-                relationships.append((subject.text, token.head.text, token.text))
-    return relationships
\ No newline at end of file
+    # (subject, verb, object) triples of a Doc or Span, as Relationship tuples
+    return RelationshipExtractor()(doc)
@@ -1,47 +1,201 @@
 from spacy import displacy
-import pandas as pd
+from spacy.displacy.templates import TPL_FIGURE, TPL_PAGE
+from collections import OrderedDict
+from itertools import islice
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
 
-def visualize_relationships(docs):
-    options = {"compact": True, "color": "blue", "bg": "#f0f0f0", "font": "Source Sans Pro"}
-    svg_fragments = [displacy.render(doc, style="dep", options=options) for doc in docs]
-    
-    # Extract the inner content of each SVG fragment and combine them with spacing
+DEP_OPTIONS = {"compact": True, "color": "blue", "bg": "#f0f0f0", "font": "Source Sans Pro"}
+# Rendered fragments kept in memory, shared by every run of this worker
+RENDER_CACHE_SIZE = int(os.environ.get("RENDER_CACHE_SIZE", 5000))
+# Sentences per relationships SVG page, and the gap between two parses
+SVG_PAGE_SIZE = int(os.environ.get("SVG_PAGE_SIZE", 100))
+SVG_SPACING = 20
+# Used for a fragment that carries no height of its own
+SVG_DEFAULT_HEIGHT = 200.0
+_SVG_WIDTH = re.compile(r'\swidth="([\d.]+)"')
+_SVG_HEIGHT = re.compile(r'\sheight="([\d.]+)"')
+
+class FragmentCache:
+    """Rendered displacy fragments by style and sentence hash, least recently used evicted first."""
+
+    def __init__(self, max_items=RENDER_CACHE_SIZE):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._fragments.move_to_end(key)
+            return fragment
+
+    def put(self, key, fragment):
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_items:
+                self._fragments.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"fragments": len(self._fragments), "max_fragments": self.max_items,
+                    "hits": self.hits, "misses": self.misses}
+
+fragment_cache = FragmentCache()
+
+def sentence_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def render_fragment(doc, style):
+    # Entity markup, or the bare <svg> element of a dependency parse
+    if style == "dep":
+        svg = displacy.render(doc, style="dep", options=DEP_OPTIONS)
+        return svg[svg.find("<svg"):svg.find("</svg>") + len("</svg>")]
+    return displacy.render(doc, style="ent")
+
+def render_fragments(sentences, style, nlp=None, cache=fragment_cache):
+    # One fragment per sentence, in order. Sentences are parsed Docs/Spans,
+    # or strings that are parsed with `nlp` only if they are not cached yet
+    sentences = list(sentences)
+    keys = [(style, sentence_hash(s if isinstance(s, str) else s.text)) for s in sentences]
+    fragments = [cache.get(key) for key in keys]
+    missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+    docs = [sentences[i] for i in missing]
+    if docs and isinstance(docs[0], str):
+        docs = nlp.pipe(docs)
+    for i, doc in zip(missing, docs):
+        fragments[i] = render_fragment(doc, style)
+        cache.put(keys[i], fragments[i])
+    return fragments
+
+def entities_page(fragments, lang="en"):
+    # The page displacy.render(..., style="ent", page=True) builds
+    content = "".join(TPL_FIGURE.format(content=fragment) for fragment in fragments)
+    return TPL_PAGE.format(content=content, lang=lang, dir="ltr")
+
+def fragment_size(svg):
+    # Width and height displacy gives the root <svg> element of a fragment
+    root = svg[:svg.find(">")]
+    width = _SVG_WIDTH.search(root)
+    height = _SVG_HEIGHT.search(root)
+    return (float(width.group(1)) if width else 0.0,
+            float(height.group(1)) if height else SVG_DEFAULT_HEIGHT)
+
+def combine_svg(fragments):
+    # Stack the fragments vertically in a single SVG, each at its own height
     combined_svg_content = ""
-    y_offset = 0
-    for svg in svg_fragments:
-        start_index = svg.find("<svg")
-        end_index = svg.find("</svg>") + len("</svg>")
-        svg_content = svg[start_index:end_index]
-        
-        # Adjust the y position of each SVG fragment
-        svg_content = svg_content.replace('<svg', f'<svg y="{y_offset}"', 1)
-        combined_svg_content += svg_content
-        y_offset += 200  # Adjust this value to control the spacing between fragments
-    
-    # Wrap the combined content in a single SVG tag
-    final_svg = f'<svg xmlns="http://www.w3.org/2000/svg" height="{y_offset}">{combined_svg_content}</svg>'
-    
-    with open("relationships.svg", "w", encoding="utf-8") as file:
-        file.write(final_svg)
-
-def convert_to_table(data):
-    rows = []
-    for entry in data:
-        row = {
-            "Person": ", ".join(entry["Person"]),
-            "Org": ", ".join(entry["Org"]),
-            "Date": ", ".join(entry["Date"]),
-            "Loc": ", ".join(entry["Loc"]),
-            "Misc": ", ".join(entry["Misc"]),
-            "Money": ", ".join(entry["Money"]),
-            "Percent": ", ".join(entry["Percent"]),
-            "Time": ", ".join(entry["Time"]),
-            "Quantity": ", ".join(entry["Quantity"]),
-            "Ordinal": ", ".join(entry["Ordinal"]),
-            "Cardinal": ", ".join(entry["Cardinal"]),
-            "Product": ", ".join(entry["Product"]),
-            "Relationships": "; ".join([f"{rel[0]} -> {rel[1]} -> {rel[2]}" for rel in entry["Relationships"]])
-        }
-        rows.append(row)
-    df = pd.DataFrame(rows)
-    return df
\ No newline at end of file
+    y_offset = 0.0
+    max_width = 0.0
+    for svg_content in fragments:
+        width, height = fragment_size(svg_content)
+        combined_svg_content += svg_content.replace('<svg', f'<svg y="{y_offset:g}"', 1)
+        y_offset += height + SVG_SPACING
+        max_width = max(max_width, width)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{max_width:g}" height="{y_offset:g}">'
+            f'{combined_svg_content}</svg>')
+
+def svg_page_path(output_path, page):
+    # relationships.svg -> relationships_page3.svg
+    return f"{os.path.splitext(output_path)[0]}_page{page}.svg"
+
+def svg_index_path(output_path):
+    return f"{os.path.splitext(output_path)[0]}.json"
+
+def svg_pages_index(output_path, sentences, page_size=SVG_PAGE_SIZE):
+    # Page files and the sentences on each, for `sentences` sentences in total
+    pages = []
+    for page, first_sentence in enumerate(range(0, sentences, page_size), start=1):
+        pages.append({"page": page, "file": os.path.basename(svg_page_path(output_path, page)),
+                      "first_sentence": first_sentence,
+                      "sentences": min(page_size, sentences - first_sentence)})
+    return {"sentences": sentences, "page_size": page_size, "pages": pages}
+
+class SvgPageWriter:
+    """Streams dependency SVG fragments to disk, `page_size` sentences per page file.
+
+    Fragments are written as they arrive and stacked at their real heights.
+    The page's root <svg> element is written first with fixed-width size
+    placeholders and filled in when the page is complete, so no page is
+    ever held in memory. close() writes an index of the pages next to them.
+    """
+
+    _HEADER = '<svg xmlns="http://www.w3.org/2000/svg" width="{:012.1f}" height="{:012.1f}">'
+
+    def __init__(self, output_path, page_size=SVG_PAGE_SIZE, first_page=1, write_index=True):
+        self.output_path = output_path
+        self.page_size = page_size
+        self.write_index = write_index
+        self.page = first_page - 1
+        self.sentences = (first_page - 1) * page_size
+        self.pages = []
+        self._file = None
+
+    def _open_page(self):
+        self.page += 1
+        self._path = svg_page_path(self.output_path, self.page)
+        # Concurrent writers of the same page each use their own file; the last rename wins
+        self._tmp_path = f"{self._path}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(self._HEADER.format(0, 0).encode("utf-8"))
+        self._count = 0
+        self._width = 0.0
+        self._height = 0.0
+
+    def _close_page(self):
+        self._file.write(b"</svg>")
+        self._file.seek(0)
+        self._file.write(self._HEADER.format(self._width, self._height).encode("utf-8"))
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self._path)
+        self.pages.append({"page": self.page, "file": os.path.basename(self._path),
+                           "first_sentence": self.sentences - self._count, "sentences": self._count,
+                           "width": self._width, "height": self._height})
+
+    def add(self, fragment):
+        if self._file is None:
+            self._open_page()
+        width, height = fragment_size(fragment)
+        self._file.write(fragment.replace('<svg', f'<svg y="{self._height:g}"', 1).encode("utf-8"))
+        self._height += height + SVG_SPACING
+        self._width = max(self._width, width)
+        self._count += 1
+        self.sentences += 1
+        if self._count == self.page_size:
+            self._close_page()
+
+    def close(self):
+        if self._file is not None:
+            self._close_page()
+        if self.write_index:
+            index = {"sentences": self.sentences, "page_size": self.page_size, "pages": self.pages}
+            tmp_path = f"{svg_index_path(self.output_path)}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            os.replace(tmp_path, svg_index_path(self.output_path))
+        return self.pages
+
+def visualize_relationships(docs, output_path="relationships.svg", nlp=None, page_size=SVG_PAGE_SIZE):
+    # Writes relationships_page<N>.svg files of `page_size` sentences each
+    # and a relationships.json index; `docs` may also be sentence strings,
+    # parsed with `nlp` where needed. Rendered one page at a time.
+    writer = SvgPageWriter(output_path, page_size)
+    docs = iter(docs)
+    while True:
+        batch = list(islice(docs, page_size))
+        if not batch:
+            break
+        for fragment in render_fragments(batch, "dep", nlp):
+            writer.add(fragment)
+    return writer.close()
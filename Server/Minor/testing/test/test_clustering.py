@@ -45,8 +45,8 @@ def extract_entities(text_chunks):
     structured_data = []
     current_row = defaultdict(list)
 
-    for chunk in text_chunks:
-        doc = nlp(chunk)
+    # Stream the chunks through spaCy in batches instead of one call per chunk
+    for doc in nlp.pipe(text_chunks, batch_size=64):
         entities = defaultdict(list)
 
         # Extract entities and group by type
@@ -38,8 +38,8 @@ def extract_entities(text_chunks):
         "Product": [],
     }
 
-    for i, chunk in enumerate(text_chunks):
-        doc = nlp(chunk)
+    # Stream the chunks through spaCy in batches instead of one call per chunk
+    for i, doc in enumerate(nlp.pipe(text_chunks, batch_size=64)):
         entities = {
             "Person": [],
             "Org": [],
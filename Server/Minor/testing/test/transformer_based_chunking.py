@@ -29,8 +29,8 @@ def extract_entities(text_chunks):
         "Cardinal": [],
     }
 
-    for chunk in text_chunks:
-        doc = nlp(chunk)
+    # Stream the chunks through spaCy in batches instead of one call per chunk
+    for doc in nlp.pipe(text_chunks, batch_size=64):
         entities = {
             "Person": [],
             "Org": [],
@@ -45,8 +45,8 @@ def extract_entities_and_relationships(text_chunks):
         "Relationships": []
     }
 
-    for i, chunk in enumerate(text_chunks):
-        doc = nlp(chunk)
+    # Stream the chunks through spaCy in batches instead of one call per chunk
+    for i, doc in enumerate(nlp.pipe(text_chunks, batch_size=64)):
         entities = {
             "Person": [],
             "Org": [],
@@ -182,7 +182,7 @@ chunks = chunk_text(text)
 structured_data = extract_entities_and_relationships(chunks)
 
 # Collect all docs for visualization
-docs = [nlp(chunk) for chunk in chunks]
+docs = list(nlp.pipe(chunks, batch_size=64))
 
 # Visualize all relationships in a single SVG
 visualize_relationships(docs)
@@ -0,0 +1,62 @@
+# Micro-benchmark: content extraction throughput on large pages.
+# Compares the previous extract_useful_content (html.parser, string +=,
+# separate passes for <p> and lists, plus a find_all for links) with the
+# single-walk extract_page.
+#
+#   python bench_extract.py [size_mb ...]
+import sys
+import time
+from bs4 import BeautifulSoup
+from content_extractor import extract_page
+
+
+def legacy_extract_useful_content(soup):
+    useful_content = ""
+    main_content = (soup.find('main') or soup.find('article') or soup.find('div', role='main') or soup.find('body'))
+    if main_content:
+        paragraphs = main_content.find_all('p')
+        for p in paragraphs:
+            useful_content += p.get_text() + "\n\n"
+        lists = main_content.find_all(['ul', 'ol'])
+        for lst in lists:
+            items = lst.find_all('li')
+            for item in items:
+                useful_content += "- " + item.get_text() + "\n"
+            useful_content += "\n"
+    return useful_content.strip()
+
+
+def legacy(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    content = legacy_extract_useful_content(soup)
+    links = [(a['href'], a.get_text()) for a in soup.find_all('a', href=True)]
+    return content, links
+
+
+def make_page(size_mb):
+    block = ("<p>Apple reported quarterly revenue of $90 billion, "
+             "<a href='/news/apple'>Apple news</a> and more text here.</p>"
+             "<ul><li>iPhone sales <ul><li>Pro</li><li>Mini</li></ul></li>"
+             "<li>Services</li></ul>")
+    count = int(size_mb * 1024 * 1024 / len(block)) + 1
+    return "<html><body><main>" + block * count + "</main></body></html>"
+
+
+def bench(func, html, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    sizes = [float(arg) for arg in sys.argv[1:]] or [0.5, 2, 8]
+    print(f"{'size MB':>8} {'legacy MB/s':>12} {'extract_page MB/s':>18} {'speedup':>8}")
+    for size in sizes:
+        html = make_page(size)
+        mb = len(html.encode("utf-8")) / (1024 * 1024)
+        old = bench(legacy, html, repeat=1)
+        new = bench(extract_page, html)
+        print(f"{mb:8.1f} {mb / old:12.2f} {mb / new:18.2f} {old / new:7.1f}x")
@@ -0,0 +1,157 @@
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString, Tag
+
+try:
+    from lxml import etree
+    import lxml.html
+except ImportError:  # fall back to BeautifulSoup's pure-Python parser
+    lxml = None
+
+# Content of these elements is never page text
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+LIST_TAGS = {"ul", "ol"}
+
+
+def _parse(html):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Strings with an XML encoding declaration must be parsed as bytes
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+
+
+def _main_content(root):
+    # Preferred content container; these lookups run in C
+    for path in (".//main", ".//article", ".//div[@role='main']", ".//body"):
+        found = root.find(path)
+        if found is not None:
+            return found
+    return root
+
+
+def _soup_main_content(soup):
+    # Same preference order as _main_content
+    return (soup.find('main') or soup.find('article') or soup.find('div', role='main')
+            or soup.find('body') or soup)
+
+
+def _lxml_events(root):
+    # ("start", tag, el), ("text", None, text) and ("end", tag, el) in
+    # document order. iterwalk leaves out comments and processing
+    # instructions, and with them the text that follows; stripping them
+    # first keeps that text
+    etree.strip_tags(root, etree.Comment, etree.ProcessingInstruction)
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        if event == "start":
+            yield event, el.tag, el
+            if el.text:
+                yield "text", None, el.text
+        else:
+            yield event, el.tag, el
+            if el.tail:
+                yield "text", None, el.tail
+
+
+def _soup_events(soup):
+    # The same events for a BeautifulSoup tree
+    yield "start", soup.name, soup
+    stack = [(soup, iter(soup.children))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield "end", node.name, node
+        elif isinstance(child, Tag):
+            yield "start", child.name, child
+            stack.append((child, iter(child.children)))
+        elif not isinstance(child, PreformattedString):  # comments, doctype, CDATA
+            yield "text", None, str(child)
+
+
+def extract_page(html):
+    """Extract the page text and its links in a single walk over the tree.
+
+    Returns (content, links) where links is a list of (href, anchor text).
+    Paragraphs come out as "text\\n\\n" and list items as "- text\\n", in
+    document order; a nested list is emitted once, under its own items, and
+    not again as part of the enclosing item. Text pieces are collected in
+    lists and joined once at the end. Without lxml the page is parsed with
+    BeautifulSoup's pure-Python parser and walked the same way.
+    """
+    if not html.strip():
+        return "", []
+    if lxml is None:
+        soup = BeautifulSoup(html, 'html.parser')
+        return _extract(_soup_events(soup), _soup_main_content(soup))
+    try:
+        root = _parse(html)
+    except etree.ParserError:
+        # Nothing but comments or whitespace, for example
+        return "", []
+    return _extract(_lxml_events(root), _main_content(root))
+
+
+def _extract(events, main):
+    out = []
+    links = []
+    # Innermost open <p>/<li> collects text; None blocks text from reaching
+    # an outer collector (skipped tags, lists nested in an item)
+    collectors = [None]
+    # Items whose own text went out when a nested list started
+    flushed = set()
+    anchor = None
+    in_main = 0
+    skip = 0
+
+    for event, tag, el in events:
+        if event == "text":
+            if skip:
+                continue
+            if collectors[-1] is not None:
+                collectors[-1].append(el)
+            if anchor is not None:
+                anchor[2].append(el)
+        elif event == "start":
+            if el is main:
+                in_main += 1
+            if tag in SKIPPED_TAGS:
+                skip += 1
+            elif tag == "a" and anchor is None and el.get("href") is not None:
+                anchor = (el, el.get("href"), [])
+            if in_main and not skip:
+                if tag in ("p", "li"):
+                    collectors.append([])
+                elif tag in LIST_TAGS:
+                    # The enclosing item's text so far comes before the nested list
+                    if collectors[-1] is not None and id(collectors[-1]) not in flushed:
+                        out.append("- " + "".join(collectors[-1]) + "\n")
+                        collectors[-1].clear()
+                        flushed.add(id(collectors[-1]))
+                    collectors.append(None)
+        else:
+            if in_main and not skip:
+                if tag in ("p", "li"):
+                    pieces = collectors.pop()
+                    if tag == "p":
+                        out.append("".join(pieces) + "\n\n")
+                    elif id(pieces) not in flushed:
+                        out.append("- " + "".join(pieces) + "\n")
+                    else:
+                        flushed.discard(id(pieces))
+                        # Text after the nested list, if any
+                        if "".join(pieces).strip():
+                            out.append("- " + "".join(pieces) + "\n")
+                elif tag in LIST_TAGS:
+                    collectors.pop()
+                    out.append("\n")
+            if tag in SKIPPED_TAGS:
+                skip -= 1
+            if anchor is not None and anchor[0] is el:
+                links.append((anchor[1], "".join(anchor[2])))
+                anchor = None
+            if el is main:
+                in_main -= 1
+            # Text that follows belongs to the parent, whose collector is now on top
+
+    return "".join(out).strip(), links
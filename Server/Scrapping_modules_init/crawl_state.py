@@ -0,0 +1,286 @@
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; crawls are then only claimed per process
+    fcntl = None
+
+from url_utils import url_key
+from record_store import RecordStore
+
+# Crawl checkpoints live under CRAWL_STATE_DIR/<crawl_id>/; "" disables them
+CRAWL_STATE_DIR = os.environ.get("CRAWL_STATE_DIR", "../crawl_state/")
+# Accepted pages between two full checkpoints (frontier, visited set and
+# meta rewritten); in between, frontier changes are appended to a log
+CHECKPOINT_PAGES = int(os.environ.get("CRAWL_CHECKPOINT_PAGES", 50))
+BLOOM_CAPACITY = int(os.environ.get("CRAWL_BLOOM_CAPACITY", 100000))
+BLOOM_ERROR_RATE = float(os.environ.get("CRAWL_BLOOM_ERROR_RATE", 0.001))
+# Crawls untouched for this long are deleted; within it they can be resumed
+CRAWL_STATE_RETENTION_SECONDS = int(os.environ.get("CRAWL_STATE_RETENTION_SECONDS", 7 * 24 * 3600))
+
+_CRAWL_ID = re.compile(r"^[0-9a-f]{32}$")
+# Crawl ids claimed by jobs of this process, from submission to the end of the job
+_claimed = set()
+_claimed_lock = threading.Lock()
+
+
+class CrawlInUseError(Exception):
+    pass
+
+
+def valid_crawl_id(crawl_id):
+    # Crawl ids name directories, so only uuid4 hex strings are accepted
+    return bool(_CRAWL_ID.match(crawl_id))
+
+
+def claim_crawl(crawl_id, root=CRAWL_STATE_DIR):
+    # Reserves the crawl for one job; False if another job (of this or
+    # another process) holds it already
+    with _claimed_lock:
+        if crawl_id in _claimed or _locked(os.path.join(root, crawl_id)):
+            return False
+        _claimed.add(crawl_id)
+        return True
+
+
+def release_crawl(crawl_id):
+    with _claimed_lock:
+        _claimed.discard(crawl_id)
+
+
+def _lock_dir(path):
+    # Exclusive lock on the crawl directory, held while the file stays open;
+    # None if someone else holds it. The OS drops it if the process dies.
+    lock_file = open(os.path.join(path, "lock"), "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+    return lock_file
+
+
+def _locked(path):
+    if not os.path.isdir(path):
+        return False
+    lock_file = _lock_dir(path)
+    if lock_file is None:
+        return True
+    lock_file.close()
+    return False
+
+
+def gc_crawl_states(root=CRAWL_STATE_DIR, retention=CRAWL_STATE_RETENTION_SECONDS):
+    # Deletes crawls untouched for longer than the retention period, except
+    # those a job holds
+    if not root or not os.path.isdir(root):
+        return []
+    with _claimed_lock:
+        claimed = set(_claimed)
+    now = time.time()
+    removed = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not _CRAWL_ID.match(name) or name in claimed or not os.path.isdir(path):
+            continue
+        if now - os.path.getmtime(path) <= retention:
+            continue
+        lock_file = _lock_dir(path)
+        if lock_file is None:
+            continue
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            lock_file.close()
+        removed.append(path)
+    return removed
+
+
+def _write_atomic(path, data):
+    # Readers see either the old file or the new one, never half of it
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class BloomFilter:
+    """Compact visited set: a fixed bit array with no false negatives.
+
+    About 1.8 bytes per URL at the default 0.1% error rate, however long
+    the URLs are. A false positive makes the crawler skip a URL it has
+    not seen, which is harmless at that rate. Same add/in interface as
+    crawler.VisitedSet.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        # Returns True if the item was (probably) not in the set yet
+        with self._lock:
+            new = False
+            for position in self._positions(item):
+                byte, bit = divmod(position, 8)
+                if not self.bits[byte] & (1 << bit):
+                    self.bits[byte] |= 1 << bit
+                    new = True
+            if new:
+                self.count += 1
+            return new
+
+    def __contains__(self, item):
+        with self._lock:
+            return all(self.bits[position // 8] & (1 << position % 8)
+                       for position in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path):
+        with self._lock:
+            data = bytes(self.bits)
+            header = {"capacity": self.capacity, "error_rate": self.error_rate, "count": self.count}
+        _write_atomic(path, json.dumps(header).encode("utf-8") + b"\n" + data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            header = json.loads(file.readline())
+            bits = file.read()
+        return cls(header["capacity"], header["error_rate"], bits, header["count"])
+
+
+class CrawlState:
+    """On-disk state of one crawl, so that it can be resumed by id.
+
+    pages.jsonl      accepted pages, appended as they are accepted (RecordStore)
+    frontier.json    URLs still waiting, as of the last checkpoint
+    frontier.log     per accepted page since then: the URLs fetched and
+                     the links queued, one JSON line each
+    visited.bloom    fetched URLs (by url_key), as of the last checkpoint
+    meta.json        accepted count, status and the crawl parameters
+
+    A page costs one appended log line; the frontier, visited set and meta
+    are only rewritten every `checkpoint_pages` pages, when the log is
+    emptied again. On load the log is replayed over the checkpoint, and
+    pages appended after it are counted and marked visited again, so a
+    crash between two checkpoints loses nothing.
+    The directory is locked while the state is open; opening a crawl
+    that is already open raises CrawlInUseError.
+    """
+
+    def __init__(self, crawl_id=None, root=CRAWL_STATE_DIR, checkpoint_pages=CHECKPOINT_PAGES):
+        self.crawl_id = crawl_id or uuid.uuid4().hex
+        if not valid_crawl_id(self.crawl_id):
+            raise ValueError(f"Invalid crawl id: {self.crawl_id}")
+        self.path = os.path.join(root, self.crawl_id)
+        self.checkpoint_pages = checkpoint_pages
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = _lock_dir(self.path)
+        if self._lock_file is None:
+            raise CrawlInUseError(f"Crawl {self.crawl_id} is already running")
+        self.meta = self._read_json("meta.json") or {"created_at": time.time(), "status": "running"}
+        # The frontier to resume from; dropped at the next checkpoint, as the
+        # crawler keeps its own
+        self.frontier = self._read_json("frontier.json")
+        self.resumed = self.frontier is not None
+
+        bloom_path = self._file("visited.bloom")
+        self.visited = BloomFilter.load(bloom_path) if os.path.exists(bloom_path) else BloomFilter()
+        self.records = RecordStore(self._file("pages.jsonl"))
+        self.accepted = len(self.records)
+        for record in self.records.iter_records(self.meta.get("accepted", 0)):
+            self.visited.add(url_key(record["url"]))
+        if self.frontier is not None:
+            self._replay_log()
+        self._log = open(self._file("frontier.log"), "a", encoding="utf-8")
+        self._since_checkpoint = 0
+
+    def _replay_log(self):
+        # Brings the checkpointed frontier and visited set up to date with
+        # the pages accepted after the checkpoint; a line cut off by a crash
+        # ends the log
+        try:
+            with open(self._file("frontier.log"), "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    for key in entry["fetched"]:
+                        self.visited.add(key)
+                    self.frontier.extend(entry["queued"])
+        except FileNotFoundError:
+            return
+        self.frontier = [entry for entry in self.frontier if url_key(entry[0]) not in self.visited]
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_json(self, name):
+        try:
+            with open(self._file(name), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+    def pages(self):
+        # Pages accepted so far, from disk
+        return self.records.iter_pages()
+
+    def add_page(self, page, fetched, queued, frontier_snapshot):
+        # `fetched`: url_keys fetched since the previous page; `queued`: the
+        # (url, depth, score) entries pushed for this page's links
+        self.records.append_page(page)
+        self.accepted += 1
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_pages:
+            self.checkpoint(frontier_snapshot())
+            return
+        self._log.write(json.dumps({"fetched": list(fetched), "queued": [list(entry) for entry in queued]}) + "\n")
+        self._log.flush()
+
+    def checkpoint(self, frontier_entries, status=None):
+        self._since_checkpoint = 0
+        self.frontier = None
+        frontier = [list(entry) for entry in frontier_entries]
+        _write_atomic(self._file("frontier.json"), json.dumps(frontier).encode("utf-8"))
+        self.visited.save(self._file("visited.bloom"))
+        self.meta.update({"accepted": self.accepted, "updated_at": time.time()})
+        if status:
+            self.meta["status"] = status
+        _write_atomic(self._file("meta.json"), json.dumps(self.meta).encode("utf-8"))
+        # Only emptied once the checkpoint is on disk: a crash before this
+        # replays entries the checkpoint already has, which is harmless
+        self._log.truncate(0)
+
+    def close(self):
+        self._log.close()
+        self.records.close()
+        self._lock_file.close()
@@ -0,0 +1,151 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import deque
+import threading
+
+from frontier import Frontier
+from url_utils import url_key
+
+
+class VisitedSet:
+    # Set of URLs shared by the fetcher threads
+    def __init__(self, urls=()):
+        self._urls = set(urls)
+        self._lock = threading.Lock()
+
+    def add(self, url):
+        # Returns True only for the first caller that adds the url
+        with self._lock:
+            if url in self._urls:
+                return False
+            self._urls.add(url)
+            return True
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self._urls
+
+    def __len__(self):
+        with self._lock:
+            return len(self._urls)
+
+
+def iter_crawl(seeds, fetch, max_depth=3, max_pages=10, workers=4, visited=None, per_host=2, state=None,
+               on_error=None):
+    """Relevance-first crawl with up to `workers` page fetches in flight.
+
+    `fetch(url)` returns None for pages that are irrelevant or failed, or a
+    (content, links) tuple for pages to keep. `links` are URLs or
+    (url, score) pairs, with score in [0, 1]; they are queued one level
+    deeper on a Frontier, so the budget goes to the most relevant
+    shallowest pages first, spread over hosts. URLs are deduplicated on
+    their canonical form (url_key). A worker takes the next URL as soon as
+    its fetch finishes, so one slow page does not hold up the others;
+    finished fetches are buffered and pages are accepted and yielded in
+    submission order; the buffer is bounded by the remaining page budget.
+
+    With a CrawlState, accepted pages and the changes to the frontier are
+    saved to disk as the crawl goes, and a state loaded from an earlier run picks
+    up where it stopped instead of starting from `seeds`. Only the pages
+    accepted in this run are yielded; `max_pages` counts all of them.
+
+    A fetch that raises is treated as a failed page: the crawl goes on,
+    and `on_error(url, error)` is called if given.
+    """
+    if state is not None:
+        visited = state.visited
+    visited = VisitedSet() if visited is None else visited
+    frontier = Frontier(per_host=per_host)
+    in_flight = deque()
+    in_flight_keys = set()
+    accepted = state.accepted if state is not None else 0
+    finished = False
+    # Logged with the next accepted page
+    fetched = []
+
+    def snapshot():
+        # Fetches still in flight go back on the frontier, at the top score
+        return frontier.snapshot() + [(url, depth, 1.0) for url, depth, _, _ in in_flight]
+
+    if state is not None and state.resumed:
+        for url, depth, score in state.frontier:
+            frontier.push(url, depth, score)
+    else:
+        for url in seeds:
+            frontier.push(url, 0)
+        if state is not None:
+            # The seeds are the first checkpoint; later pages are logged over it
+            state.checkpoint(snapshot())
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+        try:
+            while True:
+                # Keep every worker busy while there is budget left; results
+                # waiting for an older fetch do not hold a worker
+                running = sum(1 for *_, future in in_flight if not future.done())
+                while (running < workers and accepted < max_pages
+                       and len(in_flight) < workers + max_pages - accepted):
+                    item = frontier.pop()
+                    if item is None:
+                        break
+                    url, depth = item
+                    key = url_key(url)
+                    if depth > max_depth or key in visited or key in in_flight_keys:
+                        frontier.done(url)
+                        continue
+                    in_flight_keys.add(key)
+                    in_flight.append((url, depth, key, pool.submit(fetch, url)))
+                    running += 1
+
+                if not in_flight:
+                    finished = True
+                    break
+
+                # Pages are taken in submission order; until the oldest fetch
+                # is done, refill the workers that finish in the meantime
+                future = in_flight[0][3]
+                if not future.done():
+                    wait([f for *_, f in in_flight if not f.done()], return_when=FIRST_COMPLETED)
+                    continue
+
+                url, depth, key, future = in_flight.popleft()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error fetching {url}: {e}")
+                    if on_error is not None:
+                        on_error(url, e)
+                    result = None
+                in_flight_keys.discard(key)
+                frontier.done(url)
+                visited.add(key)
+                fetched.append(key)
+                if result is None or accepted >= max_pages:
+                    continue
+
+                content, links = result
+                accepted += 1
+                queued = []
+                if depth < max_depth:
+                    for link in links:
+                        link, score = link if isinstance(link, tuple) else (link, 0.0)
+                        link_key = url_key(link)
+                        if link_key not in visited and link_key not in in_flight_keys:
+                            frontier.push(link, depth + 1, score)
+                            queued.append((link, depth + 1, score))
+                page = {'url': url, 'content': content, 'depth': depth}
+                if state is not None:
+                    state.add_page(page, fetched, queued, snapshot)
+                fetched = []
+                yield page
+        finally:
+            if state is not None:
+                state.checkpoint(snapshot(), status="done" if finished else "interrupted")
+            # Budget is spent (or the consumer stopped); drop fetches that
+            # have not started yet
+            for _, _, _, future in in_flight:
+                future.cancel()
+
+
+def crawl(seeds, fetch, max_depth=3, max_pages=10, workers=4, visited=None, per_host=2, state=None,
+          on_error=None):
+    return list(iter_crawl(seeds, fetch, max_depth, max_pages, workers, visited, per_host, state, on_error))
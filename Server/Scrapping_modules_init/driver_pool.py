@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; without it memory is not checked
+    psutil = None
+
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH", "./chromedriver-win64/chromedriver.exe")
+# Browsers alive at most at once; leases beyond that wait
+DRIVER_POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", 4))
+DRIVER_LEASE_TIMEOUT = float(os.environ.get("DRIVER_LEASE_TIMEOUT", 60))
+# A browser is replaced after this many leases, or once its process tree
+# has grown by this many MB since it started (0 disables either check)
+DRIVER_MAX_PAGES = int(os.environ.get("DRIVER_MAX_PAGES", 50))
+DRIVER_MAX_MEMORY_GROWTH_MB = int(os.environ.get("DRIVER_MAX_MEMORY_GROWTH_MB", 500))
+
+
+def create_driver():
+    options = Options()
+    options.add_argument("--headless=new")
+    return webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
+
+
+def _browser_memory(driver):
+    # RSS of chromedriver and the browser processes it started, or None
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+    except (AttributeError, psutil.Error):
+        return None
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.memory_at_start = _browser_memory(driver)
+
+
+class DriverPool:
+    """Browsers shared by search and scraping, started on first use.
+
+    lease() hands a browser to one caller at a time. Idle browsers are
+    health-checked before they are handed out, and a dead session is
+    replaced; after a lease a browser is retired if it has served
+    `max_pages` leases, grown past `max_memory_growth_mb`, or failed.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, lease_timeout=DRIVER_LEASE_TIMEOUT,
+                 max_pages=DRIVER_MAX_PAGES, max_memory_growth_mb=DRIVER_MAX_MEMORY_GROWTH_MB,
+                 factory=create_driver):
+        self.size = size
+        self.lease_timeout = lease_timeout
+        self.max_pages = max_pages
+        self.max_memory_growth = max_memory_growth_mb * 1024 * 1024
+        self.factory = factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "restarts": 0, "recycled": 0, "leases": 0,
+                       "lease_timeouts": 0, "in_use": 0, "waiting": 0,
+                       "lease_wait_total": 0.0, "lease_wait_max": 0.0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _start(self):
+        pooled = _PooledDriver(self.factory())
+        self._count("started")
+        return pooled
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _healthy(self, pooled):
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def _take(self):
+        # Most recently used idle browser that still answers, else a new one
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                return self._start()
+            if self._healthy(pooled):
+                return pooled
+            self._quit(pooled)
+            self._count("restarts")
+
+    def _worn_out(self, pooled):
+        if self.max_pages and pooled.pages >= self.max_pages:
+            return True
+        if self.max_memory_growth and pooled.memory_at_start is not None:
+            memory = _browser_memory(pooled.driver)
+            if memory is not None and memory - pooled.memory_at_start > self.max_memory_growth:
+                return True
+        return False
+
+    @contextmanager
+    def lease(self, timeout=None):
+        timeout = self.lease_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        self._count("waiting")
+        acquired = self._slots.acquire(timeout=timeout)
+        self._count("waiting", -1)
+        waited = time.perf_counter() - start
+        if not acquired:
+            self._count("lease_timeouts")
+            raise TimeoutError(f"No browser free after {timeout}s")
+        with self._lock:
+            self._stats["leases"] += 1
+            self._stats["in_use"] += 1
+            self._stats["lease_wait_total"] += waited
+            self._stats["lease_wait_max"] = max(self._stats["lease_wait_max"], waited)
+
+        pooled = None
+        failed = False
+        try:
+            pooled = self._take()
+            yield pooled.driver
+        except WebDriverException:
+            # The page failed; keep the browser only if its session survived
+            failed = pooled is not None and not self._healthy(pooled)
+            raise
+        finally:
+            if pooled is not None:
+                pooled.pages += 1
+                if failed:
+                    self._count("restarts")
+                    self._quit(pooled)
+                elif self._worn_out(pooled):
+                    self._count("recycled")
+                    self._quit(pooled)
+                else:
+                    with self._lock:
+                        self._idle.append(pooled)
+            self._count("in_use", -1)
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        stats["size"] = self.size
+        stats["lease_wait_avg"] = round(stats["lease_wait_total"] / stats["leases"], 3) if stats["leases"] else 0.0
+        stats["lease_wait_total"] = round(stats["lease_wait_total"], 3)
+        stats["lease_wait_max"] = round(stats["lease_wait_max"], 3)
+        return stats
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._quit(pooled)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    # One pool per process, created when a browser is first needed
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+    return _pool
+
+
+def driver_pool_stats():
+    # Stats without starting a pool (or a browser) just to report on it
+    return _pool.stats() if _pool is not None else {"size": DRIVER_POOL_SIZE, "started": 0}
@@ -0,0 +1,83 @@
+from collections import Counter
+from itertools import count
+import heapq
+
+from url_utils import url_key, url_host
+
+# Priority lost per level of depth; link scores are in [0, 1], so a link
+# never outranks a less relevant one a level shallower
+DEPTH_PENALTY = 1.0
+
+
+class Frontier:
+    """Crawl frontier ordered by relevance and depth, spread across hosts.
+
+    Every URL is queued under its host with priority score - depth; ties go
+    to the URL queued first. pop() returns the best URL of the best host
+    that has fewer than `per_host` fetches in flight, and only falls back
+    to a busy host when every host is busy, so concurrent fetchers spread
+    across domains without sitting idle. A URL queued again while it is
+    waiting (under a different spelling, or with a better score) keeps its
+    best priority and is returned once; filtering out URLs that were
+    already fetched is up to the crawler.
+    """
+
+    def __init__(self, per_host=2):
+        self.per_host = per_host
+        self._hosts = {}
+        self._best = {}
+        self._active = Counter()
+        self._seq = count()
+
+    def push(self, url, depth, score=0.0):
+        key = url_key(url)
+        priority = score - DEPTH_PENALTY * depth
+        best = self._best.get(key)
+        if best is not None and best >= priority:
+            return False
+        self._best[key] = priority
+        heap = self._hosts.setdefault(url_host(url), [])
+        heapq.heappush(heap, (-priority, next(self._seq), key, url, depth))
+        return True
+
+    def _top(self, host):
+        # Drops entries superseded by a better push, or already returned
+        heap = self._hosts[host]
+        while heap and -heap[0][0] != self._best.get(heap[0][2]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def pop(self):
+        # Returns (url, depth), or None when the frontier is empty
+        best_host = None
+        best_rank = None
+        for host in list(self._hosts):
+            top = self._top(host)
+            if top is None:
+                del self._hosts[host]
+                continue
+            rank = (self._active[host] >= self.per_host, top[0], top[1])
+            if best_rank is None or rank < best_rank:
+                best_host, best_rank = host, rank
+        if best_host is None:
+            return None
+        _, _, key, url, depth = heapq.heappop(self._hosts[best_host])
+        del self._best[key]
+        self._active[best_host] += 1
+        return url, depth
+
+    def done(self, url):
+        # A fetch returned by pop() has finished
+        host = url_host(url)
+        if self._active[host] > 0:
+            self._active[host] -= 1
+
+    def snapshot(self):
+        # Waiting URLs as (url, depth, score), for a checkpoint
+        return [(url, depth, -neg_priority + DEPTH_PENALTY * depth)
+                for heap in self._hosts.values()
+                for neg_priority, _, key, url, depth in heap
+                if self._best.get(key) == -neg_priority]
+
+    def __len__(self):
+        return sum(len(heap) for heap in self._hosts.values())
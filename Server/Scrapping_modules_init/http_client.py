@@ -0,0 +1,62 @@
+import os
+import threading
+
+try:
+    import httpx
+except ImportError:  # without httpx every page goes through the browser
+    httpx = None
+
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 32))
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # One keep-alive connection pool shared by all fetcher threads
+    global _client
+    if httpx is None:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                headers={"User-Agent": USER_AGENT},
+                timeout=HTTP_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                    max_keepalive_connections=HTTP_MAX_CONNECTIONS // 2),
+            )
+    return _client
+
+
+def fetch_html(url, etag=None, last_modified=None):
+    # Static fetch of the page. Returns None if it can't be fetched as HTML,
+    # otherwise {"status", "html", "etag", "last_modified"}; pass the cached
+    # validators to make it a conditional GET that may come back as a 304.
+    client = get_client()
+    if client is None:
+        return None
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        response = client.get(url, headers=headers)
+    except (httpx.HTTPError, httpx.InvalidURL, UnicodeError) as e:
+        # InvalidURL and UnicodeError (bad hosts) are not HTTPErrors
+        print(f"HTTP fetch failed for {url}: {e}")
+        return None
+    if response.status_code == 304:
+        return {"status": 304, "html": None, "etag": etag, "last_modified": last_modified}
+    if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+        return None
+    return {
+        "status": 200,
+        "html": response.text,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
@@ -0,0 +1,103 @@
+# keyword_matcher.py
+from functools import lru_cache
+import re
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional, fall back to a trie regex
+    ahocorasick = None
+
+
+def _trie_pattern(keywords):
+    # Regex shaped like a trie of the keywords ("app(?:le|ly)" rather than
+    # "apple|apply"), so the engine tests each position in time bounded by
+    # the keyword length instead of trying every keyword in turn
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """All occurrences of a fixed set of keywords, found in one pass.
+
+    Uses an Aho-Corasick automaton when pyahocorasick is installed, and a
+    trie-shaped regex otherwise. Either way the cost of a scan grows with
+    the text length, not with text length times the number of keywords.
+    """
+
+    def __init__(self, keywords, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        self._key = {(k.lower() if ignore_case else k): k for k in self.keywords}
+        patterns = list(self._key)
+        self._automaton = None
+        self._pattern = None
+        if not patterns:
+            return
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern in patterns:
+                self._automaton.add_word(pattern, pattern)
+            self._automaton.make_automaton()
+        else:
+            flags = re.IGNORECASE if ignore_case else 0
+            # The lookahead reports a match at every start position, overlapping or not
+            self._pattern = re.compile("(?=(" + _trie_pattern(patterns) + "))", flags)
+            # Keywords that are a prefix of a longer one are hidden behind
+            # the longest match at a position; report them as well
+            self._prefixes = {p: [q for q in patterns if q != p and p.startswith(q)] for p in patterns}
+
+    def hits(self, text):
+        """Every keyword occurrence as (start, end, keyword), sorted by start."""
+        found = []
+        if self._automaton is not None:
+            haystack = text.lower() if self.ignore_case else text
+            for end, pattern in self._automaton.iter(haystack):
+                found.append((end - len(pattern) + 1, end + 1, self._key[pattern]))
+        elif self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                start = match.start()
+                matched = match.group(1)
+                pattern = matched.lower() if self.ignore_case else matched
+                found.append((start, start + len(matched), self._key[pattern]))
+                for prefix in self._prefixes[pattern]:
+                    found.append((start, start + len(prefix), self._key[prefix]))
+        found.sort()
+        return found
+
+    def contains(self, text):
+        if self._automaton is not None:
+            haystack = text.lower() if self.ignore_case else text
+            return next(self._automaton.iter(haystack), None) is not None
+        if self._pattern is not None:
+            return self._pattern.search(text) is not None
+        return False
+
+    def found(self, text):
+        # Distinct keywords that occur in text
+        return {keyword for _, _, keyword in self.hits(text)}
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(keywords, ignore_case):
+    return KeywordMatcher(keywords, ignore_case)
+
+
+def get_matcher(keywords, ignore_case=False):
+    # One compiled matcher per keyword set, shared by every caller
+    return _cached_matcher(tuple(keywords), ignore_case)
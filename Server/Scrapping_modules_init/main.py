@@ -2,10 +2,22 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from collections import deque
 import datetime
-from query import google_search  # Import the google_search function
-from scrapper import scrape_page, save_to_txt, dataset, visited_urls  # Import necessary functions and variables
+import os
+from search import search  # Seed URLs from the configured search backend
+from scrapper import fetch_page, FetchStats  # Import necessary functions
+from crawler import iter_crawl
+from crawl_state import CrawlState, CRAWL_STATE_DIR, claim_crawl, release_crawl, gc_crawl_states
+from driver_pool import driver_pool_stats
+from record_store import RecordStore
+
+# Number of pages fetched concurrently during a crawl
+CRAWL_WORKERS = int(os.environ.get("CRAWL_WORKERS", 4))
+# Fetches in flight per host before other hosts are preferred
+CRAWL_PER_HOST = int(os.environ.get("CRAWL_PER_HOST", 2))
+# Crawl budget; progress is checkpointed, so larger budgets can be resumed
+CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", 10))
+CRAWL_MAX_DEPTH = int(os.environ.get("CRAWL_MAX_DEPTH", 3))
 
 app = FastAPI()
 # Define request body model for scraping
@@ -13,23 +25,61 @@ class ScrapeRequest(BaseModel):
     query: str  # Search query
     keyword: list  # Keywords for scraping
 
+def iter_scrape(query, keywords, fetch_stats=None, crawl_id=None):
+    # Yields each relevant page as soon as it has been scraped.
+    # Crawl state is local to the call so overlapping requests don't share it.
+    # It is checkpointed under CRAWL_STATE_DIR/<crawl_id>; passing the id of
+    # an interrupted crawl yields its stored pages and then carries on.
+    # Crawls that are no longer resumable are cleaned up first. Raises
+    # CrawlInUseError if another job is running this crawl.
+    fetch_stats = fetch_stats or FetchStats()
+    gc_crawl_states()
+    state = CrawlState(crawl_id) if CRAWL_STATE_DIR else None
+    try:
+        if state is not None and state.resumed:
+            print(f"Resuming crawl {state.crawl_id} after {state.accepted} pages")
+            yield from state.pages()
+            google_links = []
+        else:
+            google_links = search(query, keywords)  # Search for seed links
+            print("Query searched")
+            if state is not None:
+                state.meta.update({"query": query, "keywords": list(keywords)})
+
+        # Crawl from the Google links, most relevant links first, with
+        # several pages in flight, limited to CRAWL_MAX_PAGES pages
+        yield from iter_crawl(google_links, lambda url: fetch_page(url, keywords, fetch_stats),
+                              max_depth=CRAWL_MAX_DEPTH, max_pages=CRAWL_MAX_PAGES,
+                              workers=CRAWL_WORKERS, per_host=CRAWL_PER_HOST, state=state,
+                              on_error=lambda url, error: fetch_stats.hit("failed"))
+    finally:
+        if state is not None:
+            state.close()
+    print(f"Fetch stats: {fetch_stats.as_dict()}")
+
+def run_scrape(query, keywords, output_path=None, crawl_id=None):
+    # Writes one record per page to a RecordStore (JSONL plus offset index)
+    fetch_stats = FetchStats()
+    if output_path is None:
+        output_path = f"dataset_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    store = RecordStore(output_path)
+    try:
+        pages = 0
+        for page in iter_scrape(query, keywords, fetch_stats, crawl_id):
+            store.append_page(page)
+            pages += 1
+    finally:
+        store.close()
+    return {"message": "Scraping completed", "filename": output_path, "pages": pages,
+            "fetch_stats": fetch_stats.as_dict()}
+
 @app.post("/scrape")  # /scrape endpoint define karna
 def scrape(request: ScrapeRequest):
-    visited_urls.clear()  # Clear visited URLs for each request
-    dataset.clear()  # Clear dataset for each request
-    max_depth = 3
-    google_links = google_search(request.query, request.keyword)  # Search for Google links
-    print("Query searched")
-    url_queue = deque([(link, 0) for link in google_links])  # Add Google links to the queue
-
-    while url_queue and len(dataset) < 10:  # Limit to 10 pages 
-        current_url, depth = url_queue.popleft()
-        if depth <= max_depth:
-            scrape_page(current_url, depth, request.keyword, url_queue)  # Use the keyword
-
-    filename = f"dataset_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    save_to_txt(dataset, filename)
-    return {"message": "Scraping completed", "filename": filename}
+    return run_scrape(request.query, request.keyword)
+
+@app.get("/drivers")
+def get_driver_stats():
+    return driver_pool_stats()
 
 # # Main.py
 
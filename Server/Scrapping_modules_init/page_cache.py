@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "../page_cache/")
+PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 6 * 3600))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+class PageCache:
+    """Persistent page cache keyed by normalized URL.
+
+    A page's extracted content and links are stored once per hash of its
+    HTML under blobs/, so the same page reached through several URLs costs
+    one copy on disk and is never extracted twice. The index
+    (validators, fetch and access times) lives in SQLite; entries older than
+    `ttl` are returned as stale so the caller can revalidate them, and the
+    least recently used entries are evicted once blobs exceed `max_bytes`.
+    """
+
+    def __init__(self, path=PAGE_CACHE_DIR, ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, etag TEXT,
+            last_modified TEXT, fetched_at REAL NOT NULL, last_access REAL NOT NULL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS blobs (
+            content_hash TEXT PRIMARY KEY, size INTEGER NOT NULL)""")
+        self._db.commit()
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.path, "blobs", content_hash[:2], f"{content_hash}.json")
+
+    def get(self, url):
+        # Cached entry for url (fresh or stale), or None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT p.content_hash, p.etag, p.last_modified, p.fetched_at, b.size "
+                "FROM pages p JOIN blobs b USING (content_hash) WHERE p.url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        content_hash, etag, last_modified, fetched_at, size = row
+        try:
+            with open(self._blob_path(content_hash), encoding="utf-8") as file:
+                blob = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        return {
+            "url": url,
+            "content": blob["content"],
+            "links": [tuple(link) for link in blob["links"]],
+            "content_hash": content_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": size,
+            "fresh": time.time() - fetched_at < self.ttl,
+        }
+
+    def put(self, url, html, content, links, etag=None, last_modified=None):
+        # Stores the content and links extracted from html
+        content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        blob = json.dumps({"content": content, "links": links}, ensure_ascii=False).encode("utf-8")
+        blob_path = self._blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            # Written aside and renamed, so a concurrent get never reads half a blob
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(blob)
+            os.replace(tmp_path, blob_path)
+        size = len(blob)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            self._db.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?)", (content_hash, size))
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                             (url, content_hash, etag, last_modified, now, now))
+            # The page changed: its previous body may now be unreferenced
+            if old and old[0] != content_hash:
+                self._drop_blob(old[0])
+            self._db.commit()
+            self._evict()
+        return content_hash
+
+    def revalidated(self, url):
+        # The origin answered 304: the cached copy is fresh again
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?",
+                             (now, now, url))
+            self._db.commit()
+
+    def _evict(self):
+        # Drop least recently used pages until the blobs fit in max_bytes;
+        # a blob is deleted once no page refers to it any more
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = self._db.execute("SELECT url, content_hash FROM pages ORDER BY last_access").fetchall()
+        for url, content_hash in victims:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= self._drop_blob(content_hash)
+        self._db.commit()
+
+    def _drop_blob(self, content_hash):
+        # Deletes the blob if no page refers to it any more; returns the bytes freed
+        in_use = self._db.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1",
+                                  (content_hash,)).fetchone()
+        row = self._db.execute("SELECT size FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if in_use or row is None:
+            return 0
+        self._db.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+        try:
+            os.remove(self._blob_path(content_hash))
+        except FileNotFoundError:
+            pass
+        return row[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    # Shared cache instance, or None when PAGE_CACHE_DIR is set to ""
+    global _cache
+    if not PAGE_CACHE_DIR:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+    return _cache
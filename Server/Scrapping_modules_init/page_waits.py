@@ -0,0 +1,63 @@
+import os
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Upper bound on how long we wait for one page to settle, in seconds
+PAGE_BUDGET = float(os.environ.get("PAGE_BUDGET", 10))
+# The page counts as settled after this long without DOM changes or new requests
+QUIET_MS = int(os.environ.get("PAGE_QUIET_MS", 500))
+
+# Calls back once the DOM has seen no mutations and no new resource has
+# been requested for `quiet` ms, or when `limit` ms have passed
+_QUIESCENCE_SCRIPT = """
+var quiet = arguments[0], limit = arguments[1], done = arguments[arguments.length - 1];
+var start = Date.now(), last = Date.now();
+var resources = performance.getEntriesByType('resource').length;
+var observer = new MutationObserver(function () { last = Date.now(); });
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+(function check() {
+    var count = performance.getEntriesByType('resource').length;
+    if (count !== resources) { resources = count; last = Date.now(); }
+    var now = Date.now();
+    if (now - last >= quiet || now - start >= limit) {
+        observer.disconnect();
+        done(now - start);
+    } else {
+        setTimeout(check, 50);
+    }
+})();
+"""
+
+_CLICK_ALL_SCRIPT = "arguments[0].forEach(function (el) { el.click(); }); return arguments[0].length;"
+
+
+def wait_for_document_ready(driver, timeout):
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+        lambda d: d.execute_script("return document.readyState") == "complete")
+
+
+def wait_for_dom_quiet(driver, timeout, quiet_ms=QUIET_MS):
+    driver.set_script_timeout(timeout + 1)
+    return driver.execute_async_script(_QUIESCENCE_SCRIPT, quiet_ms, int(timeout * 1000))
+
+
+def wait_for_page(driver, budget=PAGE_BUDGET):
+    # Wait until the document is loaded and has stopped changing, but never
+    # longer than `budget` seconds in total
+    deadline = time.monotonic() + budget
+    try:
+        wait_for_document_ready(driver, budget)
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            wait_for_dom_quiet(driver, remaining)
+    except (TimeoutException, WebDriverException) as e:
+        print(f"Page did not settle within {budget}s: {e.__class__.__name__}")
+    return max(0.0, deadline - time.monotonic())
+
+
+def click_all(driver, elements):
+    # One script round trip for every element instead of one per click
+    if not elements:
+        return 0
+    return driver.execute_script(_CLICK_ALL_SCRIPT, elements)
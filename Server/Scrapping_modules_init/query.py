@@ -1,35 +1,44 @@
-from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-import time
-from selenium.webdriver.chrome.options import Options
-chromeOptions = Options()
-chromeOptions.headless = True
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import os
+from search import compose_query, SEARCH_RESULTS
+from driver_pool import get_driver_pool
 
-service = Service("./chromedriver-win64/chromedriver.exe")
-driver = webdriver.Chrome(service=service, options=chromeOptions)
+# How long to wait for the result list to appear
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", 10))
 
 # Google search
-def google_search(query, keywords):
-    search_query = f"{query} {' '.join([f'[{keyword}]' for keyword in keywords])} SEO"
-    driver.get("https://www.google.com")
-    search_box = driver.find_element(By.NAME, "q")
-    search_box.send_keys(search_query)
-    search_box.send_keys(Keys.RETURN)
-    time.sleep(3) 
-
-    search_results = driver.find_elements(By.CSS_SELECTOR, 'div.g')
-    urls = []
-    for index, result in enumerate(search_results[:5]):  #first 5 for eg
-        link = result.find_element(By.TAG_NAME, 'a')
-        url = link.get_attribute("href")
-        urls.append(url)
-        print(f"Result {index + 1}: {result.text}")
-        print(f"URL: {url}\n")
+def search_google(search_query, num_results=SEARCH_RESULTS):
+    # Browsers are leased from the pool shared with the scraper
+    with get_driver_pool().lease() as driver:
+        driver.get("https://www.google.com")
+        search_box = driver.find_element(By.NAME, "q")
+        search_box.send_keys(search_query)
+        search_box.send_keys(Keys.RETURN)
+        # Continue as soon as the results are rendered
+        try:
+            WebDriverWait(driver, SEARCH_TIMEOUT, poll_frequency=0.1).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
+        except TimeoutException:
+            print("No search results found")
+
+        search_results = driver.find_elements(By.CSS_SELECTOR, 'div.g')
+        urls = []
+        for index, result in enumerate(search_results[:num_results]):
+            link = result.find_element(By.TAG_NAME, 'a')
+            url = link.get_attribute("href")
+            urls.append(url)
+            print(f"Result {index + 1}: {result.text}")
+            print(f"URL: {url}\n")
 
     return urls
 
+def google_search(query, keywords, num_results=SEARCH_RESULTS):
+    return search_google(compose_query(query, keywords), num_results)
+
 def get_user_input(q):
     query = input("Enter your query: ")
     keywords = []
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+
+# Index entry per record: byte offset and length of its line in the data file
+_ENTRY = struct.Struct("<QI")
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def record_to_page(record):
+    # Page dict as the crawler and parser use it
+    return {'url': record["url"], 'content': record["text"], 'depth': record.get("depth"),
+            'fetched_at': record.get("fetched_at"), 'content_hash': record.get("content_hash")}
+
+
+class RecordStore:
+    """Append-only store of scraped pages, one JSON record per line.
+
+    Every record holds url, depth, fetched_at, content_hash and text.
+    A fixed-width offset index next to the data file (<path>.idx) gives
+    random access to record i without reading the ones before it. On open,
+    a record left half-written by a crash is cut off and records missing
+    from the index are re-indexed. A read-only store leaves the files as
+    they are, so it can be opened while a writer is still appending.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        if readonly:
+            # Index entries are only written once their record is complete
+            self._count = os.path.getsize(self.index_path) // _ENTRY.size
+            self._data = self._index = None
+            return
+        for file_path in (self.path, self.index_path):
+            if not os.path.exists(file_path):
+                open(file_path, "wb").close()
+        self._recover()
+        self._data = open(self.path, "ab")
+        self._index = open(self.index_path, "ab")
+
+    def _recover(self):
+        data_size = os.path.getsize(self.path)
+        with open(self.index_path, "r+b") as index:
+            entries = index.read()
+            count = len(entries) // _ENTRY.size
+            # Drop entries for data that is not (or no longer) there
+            while count:
+                offset, length = _ENTRY.unpack_from(entries, (count - 1) * _ENTRY.size)
+                if offset + length <= data_size:
+                    break
+                count -= 1
+            end = sum(_ENTRY.unpack_from(entries, (count - 1) * _ENTRY.size)) if count else 0
+            index.truncate(count * _ENTRY.size)
+            index.seek(count * _ENTRY.size)
+
+            # Index complete records written after the last index entry
+            with open(self.path, "r+b") as data:
+                data.seek(end)
+                for line in data:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                    index.write(_ENTRY.pack(end, len(line)))
+                    end += len(line)
+                    count += 1
+                data.truncate(end)
+        self._count = count
+
+    def append(self, record):
+        # Returns the record number
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(line)
+            self._data.flush()
+            self._index.write(_ENTRY.pack(offset, len(line)))
+            self._index.flush()
+            self._count += 1
+            return self._count - 1
+
+    def append_page(self, page, fetched_at=None):
+        text = page['content']
+        return self.append({
+            "url": page['url'],
+            "depth": page.get('depth'),
+            "fetched_at": fetched_at or page.get('fetched_at') or time.time(),
+            "content_hash": content_hash(text),
+            "text": text,
+        })
+
+    def _entry(self, i):
+        with open(self.index_path, "rb") as index:
+            index.seek(i * _ENTRY.size)
+            return _ENTRY.unpack(index.read(_ENTRY.size))
+
+    def get(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        offset, length = self._entry(i)
+        with open(self.path, "rb") as data:
+            data.seek(offset)
+            return json.loads(data.read(length))
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def iter_records(self, start=0):
+        # Streams records start.. that exist when the iteration begins
+        stop = len(self)
+        if start >= stop:
+            return
+        offset, _ = self._entry(start)
+        with open(self.path, "rb") as data:
+            data.seek(offset)
+            for _ in range(stop - start):
+                yield json.loads(data.readline())
+
+    def iter_pages(self, start=0, skip_duplicates=False):
+        # Page dicts; with skip_duplicates, pages whose content already
+        # appeared under another URL are left out
+        seen = set()
+        for record in self.iter_records(start):
+            if skip_duplicates:
+                if record["content_hash"] in seen:
+                    continue
+                seen.add(record["content_hash"])
+            yield record_to_page(record)
+
+    def close(self):
+        if not self.readonly:
+            self._data.close()
+            self._index.close()
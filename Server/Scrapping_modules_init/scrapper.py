@@ -1,23 +1,40 @@
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import os
 import time
+import threading
 from urllib.parse import urljoin, urlparse
-from collections import deque
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-chromeOptions = Options()
-chromeOptions.headless = True
-service = Service("./chromedriver-win64/chromedriver.exe")
-driver = webdriver.Chrome(service=service, options=chromeOptions)
-
-# Set up Selenium WebDriver
-wait = WebDriverWait(driver, 10)
-visited_urls = set()
-dataset = []
+from collections import Counter, deque
+from http_client import fetch_html
+from content_extractor import extract_page
+from page_cache import get_page_cache
+from url_utils import canonical_url
+from page_waits import wait_for_page, wait_for_dom_quiet, click_all, PAGE_BUDGET
+from keyword_matcher import get_matcher
+from driver_pool import get_driver_pool
+
+# Static HTML shorter than this (after extraction) is retried in the browser
+STATIC_MIN_CHARS = int(os.environ.get("STATIC_MIN_CHARS", 500))
+
+
+class FetchStats:
+    # Per-crawl counters: pages served by each fetch tier and page cache use
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, tier, amount=1):
+        with self._lock:
+            self._counts[tier] += amount
+
+    def as_dict(self):
+        with self._lock:
+            stats = dict(self._counts)
+        hits = stats.get("cache_hit", 0) + stats.get("cache_revalidated", 0)
+        lookups = hits + stats.get("cache_miss", 0)
+        if lookups:
+            stats["cache_hit_ratio"] = round(hits / lookups, 3)
+        return stats
 
 # def extract_useful_content(soup, url):
 #     useful_content = ""
@@ -40,64 +57,20 @@ dataset = []
 #     return useful_content.strip()
 
 
-def extract_useful_content(soup):
-    useful_content = ""
-    
-    # Try finding main content in typical HTML tags
-    main_content = (soup.find('main') or soup.find('article') or soup.find('div', role='main') or soup.find('body'))
-    
-    if main_content:
-        # Extract paragraphs
-        paragraphs = main_content.find_all('p')
-        for p in paragraphs:
-            useful_content += p.get_text() + "\n\n"
-        
-        # Extract list items (if any)
-        lists = main_content.find_all(['ul', 'ol'])
-        for lst in lists:
-            items = lst.find_all('li')
-            for item in items:
-                useful_content += "- " + item.get_text() + "\n"
-            useful_content += "\n"
-    
-    return useful_content.strip()
-    # useful_content = ""
-    # main_content = soup.find('div', {'id': 'mw-content-text'})
-    # if main_content:
-    #     # extracting content
-    #     paragraphs = main_content.find_all('p')
-    #     for p in paragraphs:
-    #         useful_content += p.get_text() + "\n\n"
-        
-    #     lists = main_content.find_all(['ul', 'ol'])
-    #     for lst in lists:
-    #         items = lst.find_all('li')
-    #         for item in items:
-    #             useful_content += "- " + item.get_text() + "\n"
-    #         useful_content += "\n"
-    
-    # return useful_content.strip()
-
-def save_to_txt(data, filename='dataset.txt'):
-    output_dir = "../scraped_data/"
-    full_path = output_dir + filename
-    with open(full_path, 'w', encoding='utf-8') as file:
-        for item in data:
-            file.write(item['url'] + "\n")
-            file.write("="*50 + "\n")
-            file.write(item['content'] + "\n\n")
-            file.write("-"*50 + "\n\n")
-
-
-def interact_with_ui(driver):
-    # Example: Click on expand buttons
-    try:
-        expand_buttons = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, 'collapsible')))
-        for button in expand_buttons:
-            driver.execute_script("arguments[0].click();", button)
-            time.sleep(2)  # Wait for content to expand
-    except TimeoutException:
+def interact_with_ui(driver, budget=PAGE_BUDGET):
+    # Example: Click on expand buttons. The page has already settled, so
+    # anything collapsible is in the DOM now; no need to wait for it.
+    expand_buttons = driver.find_elements(By.CLASS_NAME, 'collapsible')
+    if not expand_buttons:
         print("No expandable sections found")
+        return 0
+    clicked = click_all(driver, expand_buttons)
+    # Wait for content to expand
+    try:
+        wait_for_dom_quiet(driver, budget)
+    except WebDriverException:
+        pass
+    return clicked
     # try:
     #     expand_buttons = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, 'mw-collapsible-toggle')))
     #     for button in expand_buttons:
@@ -106,39 +79,105 @@ def interact_with_ui(driver):
     # except TimeoutException:
     #     print("No expandable sections found")
 
-def scrape_page(url, depth, keywords, url_queue):
-    if url in visited_urls:
-        return
-    
-    visited_urls.add(url)
-    
-    try:
-        driver.get(url)
-        time.sleep(2)  # Wait
+def contains_keyword(content, keywords):
+    # One case-insensitive pass, whatever the number of keywords
+    return get_matcher(keywords, ignore_case=True).contains(content)
+
+def fetch_with_browser(url, budget=PAGE_BUDGET):
+    # Leases a browser from the shared pool for the page load, so it's safe
+    # to call from threads
+    with get_driver_pool().lease() as browser:
+        # One deadline for loading, settling and the UI interactions
+        deadline = time.monotonic() + budget
+        browser.set_page_load_timeout(budget)
+        try:
+            browser.get(url)
+        except TimeoutException:
+            # The budget limits how long we wait, not whether the page is
+            # kept: stop loading and use whatever DOM has arrived
+            browser.execute_script("window.stop();")
+        # Wait for the page to settle, within what is left of its budget
+        remaining = max(0.0, deadline - time.monotonic())
+        if remaining > 0:
+            remaining = wait_for_page(browser, remaining)
 
         # UI
-        interact_with_ui(driver)
+        interact_with_ui(browser, remaining)
+        return browser.page_source
 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        content = extract_useful_content(soup)
-        print("reached content successfully")
-        
-        # Check for keywords and save to dataset
-        if any(keyword.lower() in content.lower() for keyword in keywords):
-            dataset.append({'url': url, 'content': content})
-            for item in dataset:
-                print(item['url'])
-                print(item['content'])
-                print("\n")
-            
-            # Storing relevant links
-            for link in soup.find_all('a', href=True):
-                link_url = urljoin(url, link['href'])
-                if (urlparse(link_url).netloc == urlparse(url).netloc and link_url not in visited_urls and any(keyword.lower() in link.get_text().lower() for keyword in keywords)):
-                    url_queue.append((link_url, depth + 1))
+def load_page(url, keywords, stats):
+    # Returns (content, links) for the page, trying in order: a fresh copy
+    # from the page cache, plain HTTP (a conditional GET when a stale copy
+    # is cached) and finally the browser. Raises if the browser fails.
+    cache = get_page_cache()
+    key = canonical_url(url)
+    cached = cache.get(key) if cache else None
+    if cached and cached["fresh"]:
+        stats.hit("cache_hit")
+        stats.hit("bytes_saved", cached["size"])
+        return cached["content"], cached["links"]
+
+    validators = cached if cached and (cached["etag"] or cached["last_modified"]) else {}
+    response = fetch_html(url, validators.get("etag"), validators.get("last_modified"))
+    if response is not None and response["status"] == 304:
+        stats.hit("cache_revalidated")
+        stats.hit("bytes_saved", cached["size"])
+        cache.revalidated(key)
+        return cached["content"], cached["links"]
+    if cache:
+        stats.hit("cache_miss")
+
+    if response is not None:
+        content, links = extract_page(response["html"])
+        if len(content) >= STATIC_MIN_CHARS and contains_keyword(content, keywords):
+            stats.hit("http")
+            if cache:
+                cache.put(key, response["html"], content, links, response["etag"], response["last_modified"])
+            return content, links
+
+    page_source = fetch_with_browser(url)
+    stats.hit("browser")
+    content, links = extract_page(page_source)
+    if cache:
+        cache.put(key, page_source, content, links)
+    return content, links
+
+def fetch_page(url, keywords, stats=None):
+    # Returns (content, links) for a relevant page, None otherwise.
+    # Plain HTTP is tried first; the browser is only launched when the
+    # static HTML has too little content or none of the keywords.
+    stats = stats or FetchStats()
+    try:
+        content, anchors = load_page(url, keywords, stats)
     except Exception as e:
+        stats.hit("failed")
         print(f"Error scraping {url}: {e}")
         return None  # Return None in case of an error
+    print("reached content successfully")
+
+    # Check for keywords
+    if not contains_keyword(content, keywords):
+        return None
+    print(url)
+    print(content)
+    print("\n")
+
+    # Storing relevant links, scored by the share of keywords in the anchor
+    links = []
+    matcher = get_matcher(keywords, ignore_case=True)
+    host = urlparse(url).netloc
+    for href, text in anchors:
+        try:
+            link_url = urljoin(url, href)
+            link_host = urlparse(link_url).netloc
+        except ValueError:
+            # Malformed href, e.g. an unclosed IPv6 bracket
+            continue
+        if link_host == host:
+            found = matcher.found(text)
+            if found:
+                links.append((link_url, len(found) / len(matcher.keywords)))
+    return content, links
 
 # def main():
 #     urls, keywords = query.main()
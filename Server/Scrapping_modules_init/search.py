@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+
+# "google" drives a browser to google.com; "fixture" serves seed URLs from
+# SEARCH_FIXTURE_FILE, e.g. for offline runs and tests
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "google")
+SEARCH_FIXTURE_FILE = os.environ.get("SEARCH_FIXTURE_FILE", "search_fixture.json")
+SEARCH_RESULTS = int(os.environ.get("SEARCH_RESULTS", 5))
+# Search results are cached per composed query; "" disables the cache
+SEARCH_CACHE_FILE = os.environ.get("SEARCH_CACHE_FILE", "../search_cache.json")
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 24 * 3600))
+
+
+def compose_query(query, keywords):
+    # The string actually typed into the search engine
+    return f"{query} {' '.join([f'[{keyword}]' for keyword in keywords])} SEO"
+
+
+class SearchProvider:
+    """Turns a composed search query into a list of seed URLs."""
+
+    name = "base"
+
+    def search(self, search_query, num_results=SEARCH_RESULTS):
+        raise NotImplementedError
+
+
+class SeleniumGoogleSearch(SearchProvider):
+    name = "google"
+
+    def search(self, search_query, num_results=SEARCH_RESULTS):
+        # Imported here so the browser is only started if this backend is used
+        from query import search_google
+        return search_google(search_query, num_results)
+
+
+class FixtureSearch(SearchProvider):
+    """Seed URLs from a local file.
+
+    A .json file maps composed queries to URL lists, with "*" as the
+    fallback for any other query; any other file is read as one URL per
+    line, served for every query.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path=SEARCH_FIXTURE_FILE):
+        self.path = path
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as file:
+            if self.path.endswith(".json"):
+                return json.load(file)
+            return {"*": [line.strip() for line in file if line.strip() and not line.startswith("#")]}
+
+    def search(self, search_query, num_results=SEARCH_RESULTS):
+        fixture = self._load()
+        return list(fixture.get(search_query, fixture.get("*", [])))[:num_results]
+
+
+class CachedSearch(SearchProvider):
+    """Caches another provider's results in a JSON file, per composed query.
+
+    An entry is served while it is younger than `ttl` and was fetched for
+    at least as many results as requested. Empty results are not cached,
+    since they usually mean the search failed.
+    """
+
+    def __init__(self, provider, path=SEARCH_CACHE_FILE, ttl=SEARCH_CACHE_TTL):
+        self.provider = provider
+        self.name = provider.name
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self.path)
+
+    def search(self, search_query, num_results=SEARCH_RESULTS):
+        key = f"{self.provider.name}:{search_query}"
+        with self._lock:
+            entry = self._read().get(key)
+        if (entry and time.time() - entry["fetched_at"] < self.ttl
+                and entry["requested"] >= num_results):
+            self.hits += 1
+            return entry["urls"][:num_results]
+
+        self.misses += 1
+        urls = self.provider.search(search_query, num_results)
+        if urls:
+            with self._lock:
+                entries = self._read()
+                now = time.time()
+                # Drop expired entries while the file is rewritten anyway
+                entries = {k: e for k, e in entries.items() if now - e["fetched_at"] < self.ttl}
+                entries[key] = {"urls": urls, "requested": num_results, "fetched_at": now}
+                self._write(entries)
+        return urls
+
+
+def make_search_provider(backend=SEARCH_BACKEND):
+    if backend == "fixture":
+        return FixtureSearch()
+    if backend != "google":
+        raise ValueError(f"Unknown search backend: {backend}")
+    provider = SeleniumGoogleSearch()
+    if SEARCH_CACHE_FILE:
+        provider = CachedSearch(provider)
+    return provider
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_search_provider():
+    # Provider configured by SEARCH_BACKEND, shared by every request
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = make_search_provider()
+    return _provider
+
+
+def search(query, keywords, num_results=SEARCH_RESULTS):
+    search_query = compose_query(query, keywords)
+    urls = get_search_provider().search(search_query, num_results)
+    print(f"Search returned {len(urls)} seed URLs")
+    return urls
@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+import content_extractor
+from content_extractor import extract_page
+
+
+class ExtractPageTest(unittest.TestCase):
+    def test_paragraphs_lists_and_links(self):
+        html = ('<html><body><nav><a href="/home">Home</a></nav><main>'
+                '<p>Apple <a href="/news">news</a> today</p><script>skip()</script>'
+                '<ul><li>first</li><li>second</li></ul></main></body></html>')
+        content, links = extract_page(html)
+        self.assertEqual(content, "Apple news today\n\n- first\n- second")
+        self.assertEqual(links, [("/home", "Home"), ("/news", "news")])
+
+    def test_nested_list_follows_its_item(self):
+        content, _ = extract_page("<body><ul><li>one<ul><li>two</li></ul></li><li>three</li></ul></body>")
+        self.assertEqual(content, "- one\n- two\n\n- three")
+
+    def test_text_after_a_comment(self):
+        self.assertEqual(extract_page("<body><p>before<!-- note -->after</p></body>")[0], "beforeafter")
+
+    def test_fallback_parser_matches_lxml(self):
+        pages = ["<ol><li>x<ol><li>y<ul><li>z</li></ul>after y</li></ol>after x</li></ol>",
+                 "<body><ul><div><li>wrapped</li></div><li>b<!-- c -->d</li></ul><p>t<style>x</style>u</p></body>",
+                 '<body><nav><a href="/home">Home</a></nav><article><p>Apple <a href="/n">news</a></p>'
+                 "</article><p>outside</p></body>"]
+        self.assertEqual(extract_page(pages[0])[0], "- x\n- y\n- z\n\n- after y\n\n- after x")
+        expected = [extract_page(html) for html in pages]
+        with mock.patch.object(content_extractor, "lxml", None):
+            self.assertEqual([extract_page(html) for html in pages], expected)
+
+    def test_blank_page(self):
+        for html in ("", "  \n", "<!-- nothing -->"):
+            self.assertEqual(extract_page(html), ("", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from crawl_state import (BloomFilter, CrawlInUseError, CrawlState, claim_crawl, gc_crawl_states,
+                         release_crawl)
+from crawler import crawl, iter_crawl
+
+# Ten relevant pages in a chain, each also linking back to the start
+SITE = {f"https://s.com/{i}": [f"https://s.com/{i + 1}", "https://s.com/0"] for i in range(10)}
+
+
+def fetch(url):
+    return (f"content of {url}", SITE[url]) if url in SITE else None
+
+
+class BloomFilterTest(unittest.TestCase):
+    def test_no_false_negatives_and_low_error_rate(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        new = sum(bloom.add(f"url{i}") for i in range(2000))
+        self.assertGreater(new, 1950)
+        self.assertTrue(all(f"url{i}" in bloom for i in range(2000)))
+        false_positives = sum(f"other{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertFalse(bloom.add("url5"))
+
+    def test_save_and_load(self):
+        path = os.path.join(tempfile.mkdtemp(), "visited.bloom")
+        bloom = BloomFilter(capacity=100)
+        bloom.add("a")
+        bloom.save(path)
+        loaded = BloomFilter.load(path)
+        self.assertIn("a", loaded)
+        self.assertNotIn("b", loaded)
+        self.assertEqual(len(loaded), 1)
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_resume_continues_where_the_crawl_stopped(self):
+        expected = [page["url"] for page in crawl(["https://s.com/0"], fetch, max_depth=20, workers=1)]
+
+        state = CrawlState(root=self.root)
+        pages = iter_crawl(["https://s.com/0"], fetch, max_depth=20, workers=1, state=state)
+        first = [next(pages)["url"] for _ in range(4)]
+        pages.close()  # the process stops here
+        state.close()
+
+        resumed = CrawlState(state.crawl_id, root=self.root)
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(resumed.accepted, 4)
+        rest = [page["url"] for page in iter_crawl([], fetch, max_depth=20, workers=1, state=resumed)]
+        self.assertEqual(first + rest, expected)
+        self.assertEqual([page["url"] for page in resumed.pages()], expected)
+        self.assertEqual(resumed.meta["status"], "done")
+        resumed.close()
+
+    def test_crash_between_checkpoints_loses_nothing(self):
+        expected = [page["url"] for page in crawl(["https://s.com/0"], fetch, max_depth=20, workers=1)]
+
+        state = CrawlState(root=self.root, checkpoint_pages=100)
+        pages = iter_crawl(["https://s.com/0"], fetch, max_depth=20, workers=1, state=state)
+        first = [next(pages)["url"] for _ in range(4)]
+        # Only the seeds were checkpointed; the pages since are in the log
+        with open(os.path.join(state.path, "frontier.log"), encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 4)
+        state.checkpoint = lambda *args, **kwargs: None  # the process dies without a final checkpoint
+        pages.close()
+        state.close()
+
+        resumed = CrawlState(state.crawl_id, root=self.root)
+        self.assertEqual(resumed.accepted, 4)
+        rest = [page["url"] for page in iter_crawl([], fetch, max_depth=20, workers=1, state=resumed)]
+        self.assertEqual(first + rest, expected)
+        resumed.close()
+
+    def test_half_written_page_is_dropped(self):
+        state = CrawlState(root=self.root)
+        state.add_page({"url": "https://s.com/0", "content": "x", "depth": 0}, [], [], lambda: [])
+        state.close()
+        with open(os.path.join(state.path, "pages.jsonl"), "a", encoding="utf-8") as file:
+            file.write('{"url": "https://s.com/1", "cont')
+        loaded = CrawlState(state.crawl_id, root=self.root)
+        self.assertEqual(loaded.accepted, 1)
+        self.assertEqual(len(list(loaded.pages())), 1)
+        loaded.close()
+
+    def test_one_job_per_crawl(self):
+        state = CrawlState(root=self.root)
+        with self.assertRaises(CrawlInUseError):
+            CrawlState(state.crawl_id, root=self.root)
+        self.assertFalse(claim_crawl(state.crawl_id, root=self.root))
+        state.close()
+        self.assertTrue(claim_crawl(state.crawl_id, root=self.root))
+        self.assertFalse(claim_crawl(state.crawl_id, root=self.root))
+        release_crawl(state.crawl_id)
+        CrawlState(state.crawl_id, root=self.root).close()
+
+    def test_gc_removes_old_crawls_only(self):
+        old, recent, running = (CrawlState(root=self.root) for _ in range(3))
+        old.close()
+        recent.close()
+        past = time.time() - 3600
+        for state in (old, running):
+            os.utime(state.path, (past, past))
+        self.assertEqual(gc_crawl_states(self.root, retention=60), [old.path])
+        self.assertTrue(os.path.isdir(recent.path))
+        self.assertTrue(os.path.isdir(running.path))
+        running.close()
+
+    def test_rejects_unsafe_ids(self):
+        with self.assertRaises(ValueError):
+            CrawlState("../etc", root=self.root)
+
+
+if __name__ == "__main__":
+    unittest.main()
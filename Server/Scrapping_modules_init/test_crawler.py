@@ -0,0 +1,102 @@
+import unittest
+import threading
+import time
+from crawler import crawl, VisitedSet
+
+# Small link graph: page -> (is relevant, links)
+SITE = {
+    "a": (True, ["b", "c"]),
+    "b": (True, ["d", "a"]),
+    "c": (False, ["e"]),
+    "d": (True, ["f"]),
+    "e": (True, []),
+    "f": (True, ["g"]),
+    "g": (True, []),
+}
+
+
+def make_fetch(delay=0.0):
+    calls = []
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def fetch(url):
+        with lock:
+            calls.append(url)
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(delay)
+        with lock:
+            active[0] -= 1
+        relevant, links = SITE.get(url, (False, []))
+        return (f"content of {url}", links) if relevant else None
+
+    return fetch, calls, active
+
+
+class TestCrawler(unittest.TestCase):
+
+    def test_matches_sequential_bfs(self):
+        sequential = crawl(["a"], make_fetch()[0], workers=1)
+        concurrent = crawl(["a"], make_fetch(0.01)[0], workers=4)
+        self.assertEqual([page['url'] for page in sequential], ["a", "b", "d", "f"])
+        self.assertEqual(sequential, concurrent)
+
+    def test_respects_page_budget_and_depth(self):
+        pages = crawl(["a"], make_fetch()[0], max_pages=2, workers=3)
+        self.assertEqual([page['url'] for page in pages], ["a", "b"])
+        pages = crawl(["a"], make_fetch()[0], max_depth=1, workers=3)
+        self.assertEqual([page['url'] for page in pages], ["a", "b"])
+
+    def test_fetches_each_url_once(self):
+        fetch, calls, _ = make_fetch(0.01)
+        crawl(["a", "b", "a"], fetch, workers=4)
+        self.assertEqual(len(calls), len(set(calls)))
+
+    def test_keeps_several_fetches_in_flight(self):
+        seeds = [f"seed{i}" for i in range(8)]
+        fetch, _, active = make_fetch(0.05)
+        start = time.perf_counter()
+        crawl(seeds, fetch, workers=4)
+        duration = time.perf_counter() - start
+        self.assertEqual(active[1], 4)
+        self.assertLess(duration, 8 * 0.05)
+
+    def test_slow_page_does_not_hold_up_other_workers(self):
+        # Every fifth page is slow; the others must keep all workers busy
+        def fetch(url):
+            time.sleep(0.2 if int(url[4:]) % 5 == 0 else 0.01)
+            return (f"content of {url}", [])
+
+        seeds = [f"seed{i}" for i in range(20)]
+        start = time.perf_counter()
+        pages = crawl(seeds, fetch, max_pages=20, workers=4)
+        duration = time.perf_counter() - start
+        # 4 x 0.2s + 16 x 0.01s of work spread over 4 workers is ~0.25s;
+        # waiting on the oldest fetch before refilling takes ~0.8s
+        self.assertLess(duration, 0.5)
+        self.assertEqual([page['url'] for page in pages], seeds)
+
+    def test_failed_fetch_does_not_stop_the_crawl(self):
+        fetch = make_fetch()[0]
+        errors = []
+
+        def failing_fetch(url):
+            if url == "b":
+                raise ValueError("Invalid IPv6 URL")
+            return fetch(url)
+
+        pages = crawl(["a"], failing_fetch, workers=2, on_error=lambda url, e: errors.append(url))
+        self.assertEqual([page['url'] for page in pages], ["a"])
+        self.assertEqual(errors, ["b"])
+
+    def test_visited_set(self):
+        visited = VisitedSet(["x"])
+        self.assertFalse(visited.add("x"))
+        self.assertTrue(visited.add("y"))
+        self.assertIn("y", visited)
+        self.assertEqual(len(visited), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+
+from selenium.common.exceptions import WebDriverException
+
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException("session deleted")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DriverPoolTest(unittest.TestCase):
+    def make_pool(self, **kwargs):
+        self.drivers = []
+
+        def factory():
+            driver = FakeDriver()
+            self.drivers.append(driver)
+            return driver
+
+        kwargs.setdefault("max_memory_growth_mb", 0)
+        return DriverPool(factory=factory, **kwargs)
+
+    def test_starts_lazily_and_reuses(self):
+        pool = self.make_pool(size=2)
+        self.assertEqual(self.drivers, [])
+        for _ in range(3):
+            with pool.lease() as driver:
+                pass
+        self.assertEqual(len(self.drivers), 1)
+        self.assertEqual(pool.stats()["leases"], 3)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_recycles_after_max_pages(self):
+        pool = self.make_pool(size=1, max_pages=2)
+        for _ in range(5):
+            with pool.lease():
+                pass
+        self.assertEqual(len(self.drivers), 3)
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertEqual(pool.stats()["recycled"], 2)
+
+    def test_replaces_dead_sessions(self):
+        pool = self.make_pool(size=1)
+        with pool.lease() as driver:
+            pass
+        driver.alive = False
+        with pool.lease() as replacement:
+            self.assertIsNot(replacement, driver)
+        # A session that dies during a lease is dropped straight away
+        with self.assertRaises(WebDriverException):
+            with pool.lease() as driver:
+                driver.alive = False
+                raise WebDriverException("tab crashed")
+        self.assertEqual(pool.stats()["restarts"], 2)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+    def test_bounds_concurrent_leases(self):
+        pool = self.make_pool(size=2, lease_timeout=5)
+        peak = [0, 0]
+        lock = threading.Lock()
+
+        def work():
+            with pool.lease():
+                with lock:
+                    peak[0] += 1
+                    peak[1] = max(peak[1], peak[0])
+                time.sleep(0.05)
+                with lock:
+                    peak[0] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[1], 2)
+        self.assertEqual(len(self.drivers), 2)
+        self.assertGreater(pool.stats()["lease_wait_max"], 0)
+
+    def test_lease_timeout(self):
+        pool = self.make_pool(size=1)
+        with pool.lease():
+            with self.assertRaises(TimeoutError):
+                with pool.lease(timeout=0.05):
+                    pass
+        self.assertEqual(pool.stats()["lease_timeouts"], 1)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
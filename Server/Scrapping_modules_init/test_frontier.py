@@ -0,0 +1,73 @@
+import unittest
+
+from crawler import crawl
+from frontier import Frontier
+from url_utils import canonical_url, url_key
+
+
+class UrlTest(unittest.TestCase):
+    def test_canonical_url(self):
+        self.assertEqual(
+            canonical_url("HTTP://Example.com:80/a?b=2&utm_source=x&a=1&gclid=z#top"),
+            "http://example.com/a?a=1&b=2")
+        self.assertEqual(canonical_url("https://example.com"), "https://example.com/")
+
+    def test_url_key_ignores_scheme(self):
+        self.assertEqual(url_key("http://example.com/a?fbclid=1"), url_key("https://example.com/a"))
+        self.assertNotEqual(url_key("https://example.com/a"), url_key("https://example.com/b"))
+
+
+class FrontierTest(unittest.TestCase):
+    def test_orders_by_score_then_depth(self):
+        frontier = Frontier()
+        frontier.push("https://a.com/low", 1, 0.2)
+        frontier.push("https://a.com/high", 1, 0.9)
+        frontier.push("https://a.com/seed", 0)
+        frontier.push("https://a.com/deep", 2, 1.0)
+        order = []
+        while True:
+            item = frontier.pop()
+            if item is None:
+                break
+            order.append(item[0])
+            frontier.done(item[0])
+        self.assertEqual(order, ["https://a.com/seed", "https://a.com/high",
+                                 "https://a.com/low", "https://a.com/deep"])
+
+    def test_duplicates_keep_best_priority(self):
+        frontier = Frontier()
+        frontier.push("https://a.com/x", 1, 0.1)
+        frontier.push("https://a.com/y", 1, 0.5)
+        self.assertTrue(frontier.push("http://a.com/x?utm_medium=m", 1, 0.9))
+        self.assertFalse(frontier.push("https://a.com/x", 2, 0.0))
+        self.assertEqual(frontier.pop(), ("http://a.com/x?utm_medium=m", 1))
+        self.assertEqual(frontier.pop(), ("https://a.com/y", 1))
+        self.assertIsNone(frontier.pop())
+
+    def test_spreads_in_flight_fetches_across_hosts(self):
+        frontier = Frontier(per_host=1)
+        for i in range(3):
+            frontier.push(f"https://a.com/{i}", 0, 1.0)
+        frontier.push("https://b.com/0", 1)
+        hosts = [frontier.pop()[0].split("/")[2] for _ in range(2)]
+        self.assertEqual(hosts, ["a.com", "b.com"])
+        # Every host is busy: keep the fetchers busy on the best one anyway
+        self.assertEqual(frontier.pop(), ("https://a.com/1", 0))
+
+
+class PrioritizedCrawlTest(unittest.TestCase):
+    def test_budget_goes_to_relevant_links(self):
+        site = {
+            "https://s.com/": [("https://s.com/weak", 0.1), ("https://s.com/strong", 1.0)],
+            "https://s.com/strong": [("https://s.com/strong2", 1.0)],
+            "https://s.com/weak": [],
+            "https://s.com/strong2": [],
+        }
+        pages = crawl(["https://s.com/"], lambda url: ("text", site.get(url, [])),
+                      max_pages=3, workers=1)
+        self.assertEqual([page["url"] for page in pages],
+                         ["https://s.com/", "https://s.com/strong", "https://s.com/weak"])
+
+
+if __name__ == "__main__":
+    unittest.main()
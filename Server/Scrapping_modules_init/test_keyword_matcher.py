@@ -0,0 +1,50 @@
+import random
+import unittest
+
+from keyword_matcher import KeywordMatcher, get_matcher
+
+
+def brute_force(text, keywords, ignore_case=False):
+    haystack = text.lower() if ignore_case else text
+    hits = []
+    for keyword in dict.fromkeys(k for k in keywords if k):
+        needle = keyword.lower() if ignore_case else keyword
+        start = haystack.find(needle)
+        while start != -1:
+            hits.append((start, start + len(needle), keyword))
+            start = haystack.find(needle, start + 1)
+    return sorted(hits)
+
+
+class KeywordMatcherTest(unittest.TestCase):
+    def test_overlapping_and_prefix_hits(self):
+        matcher = KeywordMatcher(["stock", "stock price", "price", "ice"])
+        self.assertEqual(matcher.hits("the stock price"), [
+            (4, 9, "stock"), (4, 15, "stock price"), (10, 15, "price"), (12, 15, "ice")])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            keywords = ["".join(rng.choice("ab c") for _ in range(rng.randint(1, 4))) for _ in range(5)]
+            text = "".join(rng.choice("abcAB .") for _ in range(rng.randint(0, 60)))
+            for ignore_case in (False, True):
+                matcher = KeywordMatcher(keywords, ignore_case)
+                self.assertEqual(matcher.hits(text), brute_force(text, keywords, ignore_case))
+                self.assertEqual(matcher.contains(text), bool(brute_force(text, keywords, ignore_case)))
+
+    def test_ignore_case_reports_original_keyword(self):
+        matcher = KeywordMatcher(["iPhone"], ignore_case=True)
+        self.assertEqual(matcher.found("new IPHONE and iphone"), {"iPhone"})
+        self.assertFalse(KeywordMatcher(["iPhone"]).contains("new IPHONE"))
+
+    def test_empty_keywords_never_match(self):
+        self.assertEqual(KeywordMatcher([""]).hits("anything"), [])
+        self.assertFalse(KeywordMatcher([]).contains("anything"))
+
+    def test_get_matcher_is_cached(self):
+        self.assertIs(get_matcher(["Apple", "iPhone"]), get_matcher(("Apple", "iPhone")))
+        self.assertIsNot(get_matcher(["Apple"]), get_matcher(["Apple"], ignore_case=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from page_cache import PageCache
+
+
+class PageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def blob_count(self, cache):
+        return cache._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def test_shared_body_is_stored_once(self):
+        cache = PageCache(self.dir)
+        first = cache.put("https://s.com/a", "<p>same</p>", "same", [("/c", "C")])
+        second = cache.put("https://s.com/b", "<p>same</p>", "same", [("/c", "C")])
+        self.assertEqual(first, second)
+        self.assertEqual(self.blob_count(cache), 1)
+        cached = cache.get("https://s.com/b")
+        self.assertEqual((cached["content"], cached["links"]), ("same", [("/c", "C")]))
+        self.assertEqual(os.listdir(os.path.dirname(cache._blob_path(first))), [f"{first}.json"])
+
+    def test_replaced_body_is_deleted(self):
+        cache = PageCache(self.dir)
+        old = cache.put("https://s.com/a", "<p>old</p>", "old", [])
+        cache.put("https://s.com/b", "<p>kept</p>", "kept", [])
+        cache.put("https://s.com/a", "<p>new</p>", "new", [])
+        self.assertEqual(self.blob_count(cache), 2)
+        self.assertFalse(os.path.exists(cache._blob_path(old)))
+        self.assertEqual(cache.get("https://s.com/a")["content"], "new")
+
+    def test_least_recently_used_page_is_evicted(self):
+        size = len('{"content": "page 0", "links": []}')
+        cache = PageCache(self.dir, max_bytes=2 * size)
+        for i in range(2):
+            cache.put(f"https://s.com/{i}", f"<p>page {i}</p>", f"page {i}", [])
+        # Re-putting a changed page must not push the other live page out
+        cache.put("https://s.com/0", "<p>page 9</p>", "page 9", [])
+        self.assertEqual(self.blob_count(cache), 2)
+        cache.put("https://s.com/2", "<p>page 2</p>", "page 2", [])
+        self.assertIsNone(cache.get("https://s.com/1"))
+        self.assertEqual(cache.get("https://s.com/0")["content"], "page 9")
+
+
+if __name__ == "__main__":
+    unittest.main()
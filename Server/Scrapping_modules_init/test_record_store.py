@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from record_store import RecordStore, content_hash
+
+
+def page(i, text=None):
+    return {'url': f"https://s.com/{i}", 'content': text or f"text of page {i}", 'depth': i % 3}
+
+
+class RecordStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "pages.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_records_and_random_access(self):
+        store = RecordStore(self.path)
+        for i in range(5):
+            self.assertEqual(store.append_page(page(i)), i)
+        record = store.get(3)
+        self.assertEqual(record["url"], "https://s.com/3")
+        self.assertEqual(record["text"], "text of page 3")
+        self.assertEqual(record["content_hash"], content_hash("text of page 3"))
+        self.assertIn("fetched_at", record)
+        self.assertEqual([p['url'] for p in store.iter_pages(start=3)], ["https://s.com/3", "https://s.com/4"])
+        with self.assertRaises(IndexError):
+            store.get(5)
+        store.close()
+
+    def test_skip_duplicate_content(self):
+        store = RecordStore(self.path)
+        store.append_page(page(0, "same"))
+        store.append_page(page(1, "same"))
+        store.append_page(page(2))
+        self.assertEqual([p['url'] for p in store.iter_pages(skip_duplicates=True)],
+                         ["https://s.com/0", "https://s.com/2"])
+        store.close()
+
+    def test_recovers_after_crash(self):
+        store = RecordStore(self.path)
+        for i in range(3):
+            store.append_page(page(i))
+        store.close()
+        # A torn record, and an index that lost its last entry
+        with open(self.path, "ab") as data:
+            data.write(b'{"url": "https://s.com/3", "te')
+        with open(self.path + ".idx", "r+b") as index:
+            index.truncate(os.path.getsize(self.path + ".idx") - 12)
+
+        store = RecordStore(self.path)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.get(2)["url"], "https://s.com/2")
+        store.append_page(page(3))
+        self.assertEqual([p['url'] for p in store.iter_pages()], [f"https://s.com/{i}" for i in range(4)])
+        store.close()
+
+    def test_readonly_leaves_a_record_being_written(self):
+        store = RecordStore(self.path)
+        for i in range(2):
+            store.append_page(page(i))
+        # The writer is halfway through its next record
+        with open(self.path, "ab") as data:
+            data.write(b'{"url": "https://s.com/2", "te')
+        size = os.path.getsize(self.path)
+
+        reader = RecordStore(self.path, readonly=True)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual([p['url'] for p in reader.iter_pages()], ["https://s.com/0", "https://s.com/1"])
+        reader.close()
+        self.assertEqual(os.path.getsize(self.path), size)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from selenium.common.exceptions import TimeoutException
+
+import scrapper
+from page_cache import PageCache
+
+
+def page_html(text):
+    # Long enough to be kept from plain HTTP
+    return f'<html><body><p>{text} python {"filler " * 100}</p><a href="/next">Python next</a></body></html>'
+
+
+class FakeServer:
+    # Stands in for fetch_html: serves `html` with validator `etag`, and a
+    # 304 when the request carries that validator
+    def __init__(self, html, etag):
+        self.html, self.etag = html, etag
+        self.requests = []
+
+    def fetch_html(self, url, etag=None, last_modified=None):
+        self.requests.append(etag)
+        if etag is not None and etag == self.etag:
+            return {"status": 304, "html": None, "etag": etag, "last_modified": last_modified}
+        return {"status": 200, "html": self.html, "etag": self.etag, "last_modified": None}
+
+
+class SlowPageDriver:
+    # A page that never finishes loading within the page load timeout
+    def __init__(self):
+        self.scripts = []
+        self.page_source = ""
+
+    def set_page_load_timeout(self, timeout):
+        self.timeout = timeout
+
+    def get(self, url):
+        self.page_source = "<html><body><p>Loaded so far</p></body></html>"
+        raise TimeoutException("page load timed out")
+
+    def execute_script(self, script):
+        self.scripts.append(script)
+
+    def find_elements(self, by, value):
+        return []
+
+
+class FakePool:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @contextmanager
+    def lease(self):
+        yield self.driver
+
+
+class FetchWithBrowserTest(unittest.TestCase):
+    def test_page_load_timeout_keeps_the_dom(self):
+        driver = SlowPageDriver()
+        with mock.patch.object(scrapper, "get_driver_pool", return_value=FakePool(driver)), \
+                mock.patch.object(scrapper, "wait_for_page", return_value=0.0):
+            html = scrapper.fetch_with_browser("https://example.com/slow", budget=2)
+        self.assertEqual(driver.timeout, 2)
+        self.assertEqual(driver.scripts, ["window.stop();"])
+        self.assertIn("Loaded so far", html)
+
+
+class LoadPageTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = FakeServer(page_html("first"), '"v1"')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self, cache):
+        stats = scrapper.FetchStats()
+        with mock.patch.object(scrapper, "get_page_cache", return_value=cache), \
+                mock.patch.object(scrapper, "fetch_html", self.server.fetch_html), \
+                mock.patch.object(scrapper, "extract_page", wraps=scrapper.extract_page) as extract:
+            content, links = scrapper.load_page("https://s.com/a", ["python"], stats)
+        return content, links, stats.as_dict(), extract.call_count
+
+    def test_fresh_copy_is_served_without_a_request(self):
+        cache = PageCache(self.dir, ttl=3600)
+        content, links, stats, extracted = self.load(cache)
+        self.assertEqual((stats["http"], stats["cache_miss"], extracted), (1, 1, 1))
+        self.assertEqual(links, [("/next", "Python next")])
+
+        cached_content, cached_links, stats, extracted = self.load(cache)
+        self.assertEqual((cached_content, cached_links), (content, links))
+        self.assertEqual((stats["cache_hit"], extracted), (1, 0))
+        self.assertEqual(self.server.requests, [None])
+
+    def test_stale_copy_is_revalidated(self):
+        cache = PageCache(self.dir, ttl=0)
+        content, links, _, _ = self.load(cache)
+        # Unchanged: a conditional GET answered with 304, nothing re-extracted
+        cached_content, cached_links, stats, extracted = self.load(cache)
+        self.assertEqual(self.server.requests, [None, '"v1"'])
+        self.assertEqual((stats["cache_revalidated"], extracted), (1, 0))
+        self.assertEqual((cached_content, cached_links), (content, links))
+
+        # Changed: the new body is extracted and replaces the cached one
+        self.server.html, self.server.etag = page_html("second"), '"v2"'
+        new_content, _, stats, extracted = self.load(cache)
+        self.assertEqual(self.server.requests[-1], '"v1"')
+        self.assertEqual((stats["cache_miss"], stats["http"], extracted), (1, 1, 1))
+        self.assertIn("second", new_content)
+        self.assertEqual(cache.get("https://s.com/a")["etag"], '"v2"')
+
+
+if __name__ == "__main__":
+    unittest.main()
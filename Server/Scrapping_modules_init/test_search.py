@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from search import CachedSearch, FixtureSearch, SearchProvider, compose_query
+
+
+class CountingSearch(SearchProvider):
+    name = "counting"
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.calls = 0
+
+    def search(self, search_query, num_results=5):
+        self.calls += 1
+        return self.urls[:num_results]
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_compose_query(self):
+        self.assertEqual(compose_query("apple", ["iPhone", "stock"]), "apple [iPhone] [stock] SEO")
+
+    def test_fixture_json_and_lines(self):
+        path = os.path.join(self.dir, "fixture.json")
+        with open(path, "w") as file:
+            json.dump({"q [k] SEO": ["https://a.com/1", "https://a.com/2"], "*": ["https://b.com/"]}, file)
+        fixture = FixtureSearch(path)
+        self.assertEqual(fixture.search("q [k] SEO", 1), ["https://a.com/1"])
+        self.assertEqual(fixture.search("other"), ["https://b.com/"])
+
+        path = os.path.join(self.dir, "seeds.txt")
+        with open(path, "w") as file:
+            file.write("# seeds\nhttps://c.com/\n\nhttps://d.com/\n")
+        self.assertEqual(FixtureSearch(path).search("anything"), ["https://c.com/", "https://d.com/"])
+
+    def test_cache_serves_repeats_until_ttl(self):
+        path = os.path.join(self.dir, "cache.json")
+        backend = CountingSearch([f"https://a.com/{i}" for i in range(10)])
+        cached = CachedSearch(backend, path, ttl=3600)
+        first = cached.search("q", 5)
+        self.assertEqual(cached.search("q", 3), first[:3])
+        self.assertEqual(backend.calls, 1)
+        # Asking for more results than were fetched goes to the backend
+        self.assertEqual(len(cached.search("q", 8)), 8)
+        self.assertEqual(backend.calls, 2)
+        # The cache is persistent
+        self.assertEqual(CachedSearch(backend, path, ttl=3600).search("q", 8), first + backend.urls[5:8])
+        self.assertEqual(backend.calls, 2)
+        CachedSearch(backend, path, ttl=0).search("q", 5)
+        self.assertEqual(backend.calls, 3)
+
+    def test_empty_results_are_not_cached(self):
+        backend = CountingSearch([])
+        cached = CachedSearch(backend, os.path.join(self.dir, "cache.json"))
+        cached.search("q")
+        cached.search("q")
+        self.assertEqual(backend.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
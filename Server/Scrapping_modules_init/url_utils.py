@@ -0,0 +1,44 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "dclid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga"}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def normalize_url(url):
+    # Lower-case scheme and host, drop default ports and the fragment
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url):
+    # normalize_url, plus tracking parameters dropped and the remaining
+    # query parameters sorted
+    parts = urlsplit(normalize_url(url))
+    params = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+              if not is_tracking_param(name)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(params)), ""))
+
+
+def url_key(url):
+    # Dedup key for the crawl: canonical_url with http and https treated as
+    # the same page
+    url = canonical_url(url)
+    if url.startswith("http://"):
+        url = "https://" + url[len("http://"):]
+    return url
+
+
+def url_host(url):
+    return (urlsplit(url).hostname or "").lower()
@@ -0,0 +1,45 @@
+# Benchmark: relevance filter with the full pipeline vs the senter-only mode.
+# Reports the time for each mode and whether both select the same sentences.
+#
+#   python bench_parser.py [dataset.txt] [keyword ...]
+import sys
+import time
+import parser
+
+DEFAULT_KEYWORDS = ["Apple", "iPhone", "stock price"]
+
+
+def make_text(paragraphs=2000):
+    block = ("Apple reported quarterly revenue of 90 billion dollars in Cupertino. "
+             "The iPhone remained the largest product line for the company. "
+             "Analysts said the stock price reacted to guidance for the holiday quarter. "
+             "Weather in the region was mild for most of the week.\n\n")
+    return block * paragraphs
+
+
+def run(mode, text, keywords):
+    instance = parser.parser(keywords, mode=mode)
+    start = time.perf_counter()
+    sentences = instance.remove_incoherent_and_repetitive(
+        instance.filter_segments(instance.clean_segments(text)))
+    return time.perf_counter() - start, set(sentences)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as file:
+            text = file.read()
+    else:
+        text = make_text()
+    keywords = sys.argv[2:] or DEFAULT_KEYWORDS
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    full_seconds, full = run("full", text, keywords)
+    senter_seconds, senter = run("senter", text, keywords)
+    print(f"{mb:.2f} MB of text, keywords {keywords}")
+    print(f"{'mode':>8} {'seconds':>9} {'MB/s':>8} {'sentences':>10}")
+    print(f"{'full':>8} {full_seconds:9.2f} {mb / full_seconds:8.2f} {len(full):10}")
+    print(f"{'senter':>8} {senter_seconds:9.2f} {mb / senter_seconds:8.2f} {len(senter):10}")
+    print(f"speedup {full_seconds / senter_seconds:.1f}x, "
+          f"same sentences: {full == senter} "
+          f"(only full: {len(full - senter)}, only senter: {len(senter - full)})")
@@ -0,0 +1,104 @@
+# Benchmark: relationship extraction with the original token loop, with
+# spaCy's DependencyMatcher, and with the batched array matcher that
+# text_processing uses. All three get the same inputs, once as whole Docs
+# and once as sentence Spans (what the pipeline feeds them); reports the
+# time for each and whether they find the same (subject, verb, object)
+# triples as the token loop for every input.
+#
+#   python bench_relationships.py [sample.txt]
+import gc
+import sys
+import time
+
+from spacy.matcher import DependencyMatcher
+
+from Minor.NLP_backend.main import NLP_MODEL, setup_pipeline
+from Minor.NLP_backend.model_registry import get_model
+from Minor.NLP_backend.text_processing import RELATION_TYPES, RelationshipExtractor
+
+
+def make_text(paragraphs=500):
+    block = ("David Curry joined OpenAI in San Francisco in January 2023. "
+             "Google and Microsoft offered the engineers a salary of $120,000. "
+             "The team climbed Mount Everest, K2 and Mount Kilimanjaro next year. "
+             "Amazon gave the winners 50% of the 1,000 shares at 9 AM.\n")
+    return block * paragraphs
+
+
+def loop_relationships(doc):
+    # extract_relationships as it was before the array matcher
+    relationships = []
+    for token in doc:
+        if token.dep_ in ("nsubj", "dobj", "pobj", "iobj"):
+            subject = [w for w in token.head.lefts if w.dep_ == "nsubj"]
+            if subject:
+                subject = subject[0]
+                relationships.append((subject.text, token.head.text, token.text))
+    return relationships
+
+
+def dependency_matcher(vocab):
+    # The same patterns for DependencyMatcher: anchored on the subject, a
+    # head it is a left child of, and a child of that head
+    matcher = DependencyMatcher(vocab)
+    matcher.add("RELATIONSHIP", [[
+        {"RIGHT_ID": "subject", "RIGHT_ATTRS": {"DEP": "nsubj"}},
+        {"LEFT_ID": "subject", "REL_OP": "<++", "RIGHT_ID": "verb", "RIGHT_ATTRS": {}},
+        {"LEFT_ID": "verb", "REL_OP": ">", "RIGHT_ID": "object",
+         "RIGHT_ATTRS": {"DEP": {"IN": list(RELATION_TYPES)}}},
+    ]])
+
+    def relationships(doc):
+        first_subject = {}
+        for _, (subject, verb, obj) in matcher(doc):
+            if obj not in first_subject or subject < first_subject[obj][0]:
+                first_subject[obj] = (subject, verb)
+        return [(doc[s].text, doc[v].text, doc[o].text) for o, (s, v) in sorted(first_subject.items())]
+    return relationships
+
+
+def timed(extract, docs):
+    # Garbage collection is off while timing, as with timeit
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        found = [[tuple(rel[:3]) for rel in relationships] for relationships in extract(docs)]
+        return time.perf_counter() - start, found
+    finally:
+        gc.enable()
+
+
+def compare(name, items, matcher):
+    extractors = (("token loop", lambda batch: [loop_relationships(item) for item in batch]),
+                  ("DependencyMatcher", lambda batch: [matcher(item) for item in batch]),
+                  ("batched arrays", lambda batch: RelationshipExtractor().pipe(batch)))
+    # A short untimed run first, so the first extractor timed does not pay
+    # for warming up spaCy's and numpy's code paths
+    for _, extract in extractors:
+        list(extract(items[:50]))
+    results = [(label, *timed(extract, items)) for label, extract in extractors]
+    loop_seconds, loop = results[0][1:]
+    print(f"{len(items)} {name}, {sum(len(relationships) for relationships in loop)} relationships")
+    print(f"{'extractor':>18} {'seconds':>9} {name + '/s':>14} {'speedup':>8} {'same triples':>13}")
+    for label, seconds, found in results:
+        print(f"{label:>18} {seconds:9.3f} {len(items) / seconds:14.0f} "
+              f"{loop_seconds / seconds:7.1f}x {str(found == loop):>13}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as file:
+            text = file.read()
+    else:
+        text = make_text()
+    nlp = get_model(NLP_MODEL, setup=setup_pipeline)
+    docs = list(nlp.pipe(line for line in text.splitlines() if line.strip()))
+    sentences = [sent for doc in docs for sent in doc.sents]
+    matcher = dependency_matcher(nlp.vocab)
+
+    # DependencyMatcher copies every Span into a new Doc; that is part of
+    # its cost on sentences
+    compare("docs", docs, matcher)
+    print()
+    compare("sentences", sentences, matcher)
@@ -0,0 +1,153 @@
+# dedupe.py
+from itertools import islice
+import os
+import re
+import zlib
+import numpy as np
+
+# Sentences whose estimated Jaccard similarity (over word shingles) reaches
+# the threshold count as near-duplicates; 1 or more turns the pass off
+NEAR_DUP_THRESHOLD = float(os.environ.get("DEDUPE_THRESHOLD", 0.8))
+SHINGLE_SIZE = int(os.environ.get("DEDUPE_SHINGLE_SIZE", 3))
+NUM_PERM = int(os.environ.get("DEDUPE_PERMUTATIONS", 64))
+
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    # Lowercased word n-grams; a sentence shorter than `size` is one shingle
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def lsh_params(threshold, num_perm, miss_weight=0.9):
+    # Bands x rows minimising the (weighted) chance of a false candidate
+    # below the threshold plus that of a missed pair above it. Candidates
+    # are verified on their signatures, so a false candidate only costs a
+    # comparison and misses are weighted more
+    steps = np.linspace(0, 1, 201)
+    below, above = steps[steps < threshold], steps[steps >= threshold]
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+        false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+        error = (1 - miss_weight) * false_positive + miss_weight * false_negative
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashLSH:
+    """Streaming near-duplicate index.
+
+    Each sentence gets a MinHash signature, split into bands; sentences
+    sharing a band bucket are candidates and are compared on their
+    signatures. Only kept sentences are indexed, so memory grows with the
+    number of distinct sentences, and each lookup touches a handful of
+    buckets instead of every earlier sentence.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        random = np.random.RandomState(seed)
+        self._a = random.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = random.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = []
+
+    def signatures(self, texts):
+        # One numpy pass for a batch: hash every shingle of every text, then
+        # take the per-text minimum of each permutation
+        hashes = []
+        offsets = []
+        for text in texts:
+            offsets.append(len(hashes))
+            hashes.extend(zlib.crc32(s.encode("utf-8")) & _PRIME
+                          for s in shingles(text, self.shingle_size))
+        if not offsets:
+            return np.empty((0, len(self._a)), dtype=np.uint32)
+        permuted = (np.array(hashes, dtype=np.uint64)[:, None] * self._a + self._b) % _PRIME
+        return np.minimum.reduceat(permuted, offsets, axis=0).astype(np.uint32)
+
+    def signature(self, text):
+        return self.signatures([text])[0]
+
+    def add(self, text, signature=None):
+        # Returns False if text is a near-duplicate of an indexed sentence,
+        # otherwise indexes it and returns True
+        if signature is None:
+            signature = self.signature(text)
+        keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+        checked = set()
+        for bucket, key in zip(self._buckets, keys):
+            for candidate in bucket.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                    return False
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(index)
+        return True
+
+
+class Deduper:
+    """Exact, incoherent and near-duplicate passes over a sentence stream.
+
+    Keeps the first occurrence of every sentence, in order, and counts how
+    many sentences each pass removed.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, min_words=4):
+        self.min_words = min_words
+        self.seen = set()
+        self.near = MinHashLSH(threshold) if threshold < 1 else None
+        self.removed = {"exact": 0, "incoherent": 0, "near_duplicate": 0}
+        self.kept = 0
+
+    def _exact_and_coherent(self, sentence):
+        if sentence in self.seen:
+            self.removed["exact"] += 1
+            return False
+        self.seen.add(sentence)
+        if len(sentence.split()) < self.min_words:
+            self.removed["incoherent"] += 1
+            return False
+        return True
+
+    def _near(self, sentence, signature=None):
+        if self.near is not None and not self.near.add(sentence, signature):
+            self.removed["near_duplicate"] += 1
+            return False
+        self.kept += 1
+        return True
+
+    def add(self, sentence):
+        return self._exact_and_coherent(sentence) and self._near(sentence)
+
+    def filter(self, sentences, batch_size=1024):
+        # Signatures are computed batch_size sentences at a time
+        sentences = iter(sentences)
+        while True:
+            chunk = list(islice(sentences, batch_size))
+            if not chunk:
+                return
+            batch = [sentence for sentence in chunk if self._exact_and_coherent(sentence)]
+            signatures = self.near.signatures(batch) if self.near is not None else [None] * len(batch)
+            for sentence, signature in zip(batch, signatures):
+                if self._near(sentence, signature):
+                    yield sentence
+
+    def stats(self):
+        return {"kept": self.kept, "removed": dict(self.removed)}
@@ -0,0 +1,130 @@
+# jobs.py
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, stages):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.stages = OrderedDict((name, {"status": "pending"}) for name in stages)
+
+    def start_stage(self, name):
+        self.stages.setdefault(name, {})
+        self.stages[name].update({"status": "running", "started_at": time.time()})
+
+    def update_stage(self, name, **info):
+        self.stages.setdefault(name, {"status": "running"}).update(info)
+
+    def finish_stage(self, name, **info):
+        stage = self.stages.setdefault(name, {})
+        stage.update(info)
+        stage["status"] = "done"
+        stage["finished_at"] = time.time()
+        if "started_at" in stage:
+            stage["seconds"] = round(stage["finished_at"] - stage["started_at"], 3)
+
+    def to_dict(self):
+        done = sum(1 for stage in self.stages.values() if stage["status"] == "done")
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": f"{done}/{len(self.stages)}",
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs pipeline jobs on a bounded thread pool.
+
+    At most `workers` jobs run at once and at most `max_queued` more wait
+    for a free worker; submitting beyond that raises QueueFullError.
+    """
+
+    def __init__(self, workers=1, max_queued=8, keep_finished=100):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _active(self):
+        return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def _prune(self):
+        # Forget the oldest finished jobs once there are too many
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def submit(self, func, *args, stages=()):
+        # func is called as func(job, *args) and its return value is the job result
+        with self._lock:
+            if self._active() >= self.workers + self.max_queued:
+                raise QueueFullError("Too many jobs queued, try again later")
+            self._prune()
+            job = Job(stages)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def add_finished(self, result, stages=(), **info):
+        # Records a job whose result is already known, e.g. served from a
+        # cache, without taking a worker; every stage is marked done with `info`
+        with self._lock:
+            self._prune()
+            job = Job(stages)
+            self._jobs[job.id] = job
+        job.started_at = time.time()
+        for name in job.stages:
+            job.finish_stage(name, **info)
+        job.result = result
+        job.status = "done"
+        job.finished_at = time.time()
+        return job
+
+    def _run(self, job, func, args):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = func(job, *args)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            for stage in job.stages.values():
+                if stage["status"] == "running":
+                    stage["status"] = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+        }
@@ -3,22 +3,45 @@ import sys
 print(sys.path)
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
+from typing import Optional
 import os
+import shutil
 
 # Importing necessary functions from scrapping_modules_init and nlp_backend
-from Scrapping_modules_init.main import scrape as scrape_pages
-from Minor.NLP_backend.main import process_nlp
-import parser
+from Minor.NLP_backend.model_registry import registry
+from jobs import JobManager, QueueFullError
+from workspace import create_workspace, resolve_artifact, valid_run_id
+from pipeline import stream_process, cache_result, restore_cached, render_run, svg_page_file, svg_page_index
+from result_cache import RESULT_CACHE_DIR, ResultCache, normalize_keywords, valid_cache_key
+from Minor.NLP_backend.main import RENDER_PAGE_SIZE
+from Minor.NLP_backend.text_processing import TABLE_COLUMNS
+from Minor.NLP_backend.visualization import fragment_cache
+from Scrapping_modules_init.main import driver_pool_stats, claim_crawl, release_crawl
 
 app = FastAPI()
 
+# Bounded worker pool for /process jobs. Every job writes into its own
+# workspace, so runs can overlap safely.
+PROCESS_WORKERS = int(os.environ.get("PROCESS_WORKERS", 2))
+PROCESS_QUEUE_DEPTH = int(os.environ.get("PROCESS_QUEUE_DEPTH", 8))
+PIPELINE_STAGES = ("scrape", "parse", "nlp")
+
+job_manager = JobManager(workers=PROCESS_WORKERS, max_queued=PROCESS_QUEUE_DEPTH)
+# Finished results by query and keywords; a repeated request is answered
+# from here, whatever columns it asks for
+result_cache = ResultCache() if RESULT_CACHE_DIR else None
+
 class ScrapeRequest(BaseModel):
     query: str
     keywords: list
     columns_to_save: list
-    
+    # Resume an interrupted crawl instead of starting a new one
+    crawl_id: Optional[str] = None
+    # Recompute even if a cached result exists, and cache the new one
+    refresh: bool = False
+
 dummy_columns_to_save = [
         "Person",
         "Org",
@@ -34,37 +57,194 @@ dummy_columns_to_save = [
         "Product"
     ]
 
-@app.post("/process")
-async def process_request(request: ScrapeRequest):
+def run_result(workspace, svg_file, csv_file, **info):
+    svg_name = os.path.basename(svg_file)
+    csv_name = os.path.basename(csv_file)
+    return {
+        "message": "Processing completed successfully",
+        "run_id": workspace.run_id,
+        "svg_file": svg_name,
+        "csv_file": csv_name,
+        "svg_url": f"/files/svg/{svg_name}",
+        "svg_pages_url": f"/files/svg/{svg_name}/pages",
+        "csv_url": f"/files/csv/{csv_name}",
+        "render_url": f"/runs/{workspace.run_id}/render",
+        **info,
+    }
+
+def run_pipeline(job, request):
+    # All artifacts of this run live in a private workspace
     try:
-        # Step 1: Call the scraper and get filename of scraped data
-        scrape_result = scrape_pages(request)
-        
-        parser_instance = parser.parser(request.keywords)
-        parsed_file_path = parser_instance.parse_data(scrape_result['filename'])
-        
-        # Step 2: Process the scraped data with NLP model using returned filename
-        svg_file, csv_file = process_nlp(parsed_file_path, request.columns_to_save)
+        workspace = create_workspace()
+        try:
+            # Scraping, parsing and NLP run as overlapping streaming stages
+            svg_file, csv_file = stream_process(job, request, workspace)
+            key = None
+            if result_cache:
+                # The run's artifacts are complete; failing to cache them is not fatal
+                try:
+                    key = cache_result(job, request, workspace, result_cache)
+                except Exception as e:
+                    print(f"Could not cache the result of run {workspace.run_id}: {e}")
+        finally:
+            workspace.release()
+    finally:
+        # The crawl was claimed when the job was submitted
+        if request.crawl_id is not None:
+            release_crawl(request.crawl_id)
+    return run_result(workspace, svg_file, csv_file, cached=False, cache_key=key)
 
+def serve_cached(request):
+    # The result of an earlier run with the same query and keywords, in a
+    # workspace of its own, or None if there is no fresh one
+    workspace = create_workspace()
+    cached = None
+    try:
+        cached = restore_cached(request, workspace, result_cache)
+    finally:
+        workspace.release()
+        # Nothing to serve (or the restore failed): the workspace goes too
+        if cached is None:
+            shutil.rmtree(workspace.path, ignore_errors=True)
+    if cached is None:
+        return None
+    svg_file, csv_file, entry = cached
+    return run_result(workspace, svg_file, csv_file, cached=True, cache_key=entry["key"],
+                      cached_run_id=entry["run_id"], cached_at=entry["created_at"])
+
+@app.post("/process", status_code=202)
+def process_request(request: ScrapeRequest):
+    # Enqueue the crawl + NLP run and return straight away; poll /jobs/{id}.
+    # A cached result is recorded as a finished job right here instead.
+    if request.crawl_id is not None and not valid_run_id(request.crawl_id):
+        raise HTTPException(status_code=400, detail="Invalid crawl_id")
+    unknown = [column for column in request.columns_to_save if column not in TABLE_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(map(str, unknown))}")
+    # Normalized once, so the crawl, the parser and the result cache all
+    # see the same keywords
+    request.keywords = normalize_keywords(request.keywords)
+    # Resumed crawls always run, they carry on from their own state
+    result = None
+    if result_cache and request.crawl_id is None and not request.refresh:
+        result = serve_cached(request)
+    if result is not None:
+        job = job_manager.add_finished(result, stages=PIPELINE_STAGES, cached=True)
         return {
-            "message": "Processing completed successfully",
-            "svg_file": svg_file,
-            "csv_file": csv_file,
+            "message": "Served from cache",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+            "result_url": f"/jobs/{job.id}/result",
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # A crawl can only be resumed by one job at a time
+    if request.crawl_id is not None and not claim_crawl(request.crawl_id):
+        raise HTTPException(status_code=409, detail="This crawl is already running")
+    try:
+        job = job_manager.submit(run_pipeline, request, stages=PIPELINE_STAGES)
+    except QueueFullError as e:
+        if request.crawl_id is not None:
+            release_crawl(request.crawl_id)
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "message": "Processing started",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result",
+    }
+
+@app.get("/jobs")
+async def get_jobs_stats():
+    return job_manager.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}")
+    return job.result
+
+@app.get("/cache")
+async def get_result_cache_stats():
+    if result_cache is None:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    return result_cache.stats()
+
+@app.delete("/cache")
+def clear_result_cache():
+    if result_cache is None:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    return {"cleared": result_cache.clear()}
+
+@app.delete("/cache/{key}")
+def invalidate_cached_result(key: str):
+    # key is the cache_key of a job result, or from GET /cache
+    if result_cache is None or not valid_cache_key(key) or not result_cache.invalidate(key):
+        raise HTTPException(status_code=404, detail="No cached result for this key")
+    return {"invalidated": key}
+
+@app.get("/models")
+async def get_model_stats():
+    # Load time and memory of every pipeline loaded by this worker
+    return {"models": registry.stats()}
+
+@app.get("/drivers")
+async def get_driver_stats():
+    # Browser pool shared by search and scraping: size, leases, waits, restarts
+    return driver_pool_stats()
+
+@app.get("/runs/{run_id}/render")
+def render_run_sentences(run_id: str, style: str = "ent", start: int = 0, count: int = RENDER_PAGE_SIZE):
+    # Renders sentences start..start+count of a run on request: entities as
+    # an HTML page (style=ent) or dependency parses as one SVG (style=dep)
+    if style not in ("ent", "dep"):
+        raise HTTPException(status_code=400, detail="style must be 'ent' or 'dep'")
+    if start < 0 or not 0 < count <= RENDER_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"start must be >= 0 and count 1..{RENDER_PAGE_SIZE}")
+    result = render_run(run_id, style, start, count) if valid_run_id(run_id) else None
+    if result is None:
+        raise HTTPException(status_code=404, detail="No sentences stored for this run")
+    markup, total = result
+    media_type = "text/html" if style == "ent" else "image/svg+xml"
+    return Response(markup, media_type=media_type, headers={"X-Total-Sentences": str(total)})
+
+@app.get("/render/cache")
+async def get_render_cache_stats():
+    return fragment_cache.stats()
+
+@app.get("/files/svg/{filename}/pages")
+def get_svg_pages(filename: str):
+    # The relationships SVG comes in pages of SVG_PAGE_SIZE sentences
+    index = svg_page_index(filename)
+    if index is None:
+        raise HTTPException(status_code=404, detail="SVG file not found")
+    for page in index["pages"]:
+        page["url"] = f"/files/svg/{filename}?page={page['page']}"
+    return index
 
 @app.get("/files/svg/{filename}")
-async def get_svg_file(filename: str):
-    file_path = f"relationships/{filename}"  # Adjust path as needed
-    if os.path.exists(file_path):
+def get_svg_file(filename: str, page: int = 1):
+    # <run>_relationships.svg serves one page (the first by default), which
+    # is rendered the first time it is asked for; page files can also be
+    # requested by their own name
+    file_path = svg_page_file(filename, page) or resolve_artifact(filename)
+    if file_path and filename.endswith(".svg"):
         return FileResponse(file_path)
     raise HTTPException(status_code=404, detail="SVG file not found")
 
 @app.get("/files/csv/{filename}")
 async def get_csv_file(filename: str):
-    file_path = f"structured_data/{filename}"  # Adjust path as needed
-    if os.path.exists(file_path):
+    file_path = resolve_artifact(filename)
+    if file_path and filename.endswith(".csv"):
         return FileResponse(file_path)
     raise HTTPException(status_code=404, detail="CSV file not found")
\ No newline at end of file
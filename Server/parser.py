@@ -1,16 +1,56 @@
-import spacy
-from spacy.matcher import PhraseMatcher
+from Minor.NLP_backend.model_registry import get_model
+from Scrapping_modules_init.keyword_matcher import get_matcher
+from Scrapping_modules_init.record_store import RecordStore
+from dedupe import Deduper
+from bisect import bisect_right
 import os
 import re
 # import time
-   
+
+PARSER_MODEL = "en_core_web_lg"
+# "full" runs the whole pipeline for doc.sents; "senter" loads only the
+# tokenizer and the statistical sentence segmenter, which is all the
+# relevance filter needs
+FILTER_MODE = os.environ.get("PARSER_FILTER_MODE", "full")
+FILTER_BATCH_SIZE = int(os.environ.get("PARSER_BATCH_SIZE", 8))
+# Cleaned text is fed to the pipeline in segments of about this many
+# characters, cut where the raw text had a full stop
+SEGMENT_CHARS = int(os.environ.get("PARSER_SEGMENT_CHARS", 20000))
+# Only parse the text around keyword hits: each hit keeps this many raw
+# sentences of context on either side
+KEYWORD_WINDOWS = os.environ.get("PARSER_KEYWORD_WINDOWS", "1") == "1"
+WINDOW_SENTENCES = int(os.environ.get("PARSER_WINDOW_SENTENCES", 1))
+
+# Components the relevance filter never uses
+SEGMENTATION_EXCLUDE = ["tok2vec", "tagger", "morphologizer", "parser", "attribute_ruler",
+                        "lemmatizer", "ner", "entity_ruler"]
+
+
+def setup_segmentation(nlp):
+    # senter ships disabled in the trained pipelines
+    if "senter" in nlp.disabled:
+        nlp.enable_pipe("senter")
+    elif not any(name in nlp.pipe_names for name in ("senter", "sentencizer")):
+        nlp.add_pipe("sentencizer")
+
+
+def load_filter_model(mode=FILTER_MODE):
+    if mode == "full":
+        return get_model(PARSER_MODEL)
+    if mode == "senter":
+        return get_model(PARSER_MODEL, setup=setup_segmentation, exclude=SEGMENTATION_EXCLUDE)
+    raise ValueError(f"Unknown parser filter mode: {mode}")
+
+
 class parser:
-    def __init__(self, context_keywords):
-        self.nlp = spacy.load("en_core_web_lg")
-        self.matcher = PhraseMatcher(self.nlp.vocab)
+    def __init__(self, context_keywords, mode=FILTER_MODE):
+        # Shared pipeline, loaded once per worker by the model registry
+        self.nlp = load_filter_model(mode)
         self.context_keywords = context_keywords
-        context_patterns = [self.nlp.make_doc(text) for text in context_keywords]
-        self.matcher.add("CONTEXT_TERMS", context_patterns)
+        # Finds every keyword in one pass; used for the pre-pass over the
+        # cleaned text and for matching sentences
+        self.matcher = get_matcher(context_keywords)
+        self.stats = {"cleaned_chars": 0, "parsed_chars": 0}
 
     def clean_text(self, text):
         sentences = text.split('.')
@@ -21,21 +61,97 @@ class parser:
                 cleaned_sentences.append(sentence)
         cleaned_text = ' '.join(re.sub(r'[^A-Za-z0-9., ]+', '', ' '.join(cleaned_sentences)).split())
         return cleaned_text
-    
+
+    def clean_segments(self, text, max_chars=SEGMENT_CHARS):
+        # clean_text in pieces of at most ~max_chars, split only where the
+        # raw text had a full stop; joined with spaces they equal clean_text(text)
+        group = []
+        size = 0
+        for sentence in text.split('.'):
+            group.append(sentence)
+            size += len(sentence) + 1
+            if size >= max_chars:
+                segment = self.clean_text('.'.join(group))
+                if segment:
+                    yield segment
+                group = []
+                size = 0
+        segment = self.clean_text('.'.join(group))
+        if segment:
+            yield segment
+
+    def keyword_windows(self, text, context=WINDOW_SENTENCES, max_chars=SEGMENT_CHARS):
+        # Like clean_segments, but yields only the windows of raw sentences
+        # around keyword hits. Overlapping and adjacent windows are merged
+        # (up to ~max_chars), so spaCy still sees contiguous text to find
+        # the exact sentence bounds in
+        pieces = [piece for piece in (self.clean_text(s) for s in text.split('.')) if piece]
+        starts = []
+        offset = 0
+        for piece in pieces:
+            starts.append(offset)
+            offset += len(piece) + 1
+        joined = ' '.join(pieces)
+        self.stats["cleaned_chars"] += len(joined)
+        windows = []
+        for start, end, _ in self.matcher.hits(joined):
+            hit_first = bisect_right(starts, start) - 1
+            hit_last = bisect_right(starts, end - 1) - 1
+            first = max(0, hit_first - context)
+            last = min(len(pieces) - 1, hit_last + context)
+            if windows and first <= windows[-1][1] + 1:
+                prev_first, prev_last = windows[-1]
+                if last <= prev_last:
+                    continue
+                # Past the size cap, start a new window after the previous
+                # one, unless the hit itself straddles the two
+                if (hit_first <= prev_last
+                        or starts[last] + len(pieces[last]) - starts[prev_first] <= max_chars):
+                    windows[-1][1] = last
+                    continue
+                first = prev_last + 1
+            windows.append([first, last])
+
+        for first, last in windows:
+            window = joined[starts[first]:starts[last] + len(pieces[last])]
+            self.stats["parsed_chars"] += len(window)
+            yield window
+
+    def relevant_segments(self, text):
+        if KEYWORD_WINDOWS:
+            return self.keyword_windows(text)
+        return self.clean_segments(text)
+
     def filter_relevant_info(self,text):
-        doc = self.nlp(text)
+        return self.filter_segments([text])
+
+    def filter_segments(self, segments):
         relevant_sentences = []
-        
-        for sent in doc.sents:
-            matches = self.matcher(sent)
-            if matches:
-                if any(keyword in sent.text for keyword in self.context_keywords):
-                    relevant_sentences.append(sent.text)
+        for doc in self.nlp.pipe(segments, batch_size=FILTER_BATCH_SIZE):
+            # Keyword hits that line up with token boundaries, as a
+            # PhraseMatcher match would; sorted by start offset
+            hits = [(start, end) for start, end, _ in self.matcher.hits(doc.text)
+                    if doc.char_span(start, end) is not None]
+            if not hits:
+                continue
+            i = 0
+            for sent in doc.sents:
+                while i < len(hits) and hits[i][0] < sent.start_char:
+                    i += 1
+                j = i
+                while j < len(hits) and hits[j][0] < sent.end_char:
+                    if hits[j][1] <= sent.end_char:
+                        relevant_sentences.append(sent.text)
+                        break
+                    j += 1
         return relevant_sentences
     
     def remove_incoherent_and_repetitive(self,sentences):
-        unique_sentences = list(set(sentences))  # Remove duplicates
-        coherent_sentences = [sent for sent in unique_sentences if len(sent.split()) > 3]  # Remove incoherent sentences
+        # Drops exact duplicates, sentences of 3 words or fewer and near-duplicates,
+        # keeping the first occurrence of each in order
+        deduper = Deduper()
+        coherent_sentences = list(deduper.filter(sentences))
+        self.stats["dedupe"] = deduper.stats()
         return coherent_sentences
     
     def open_file(self,file: str):
@@ -51,14 +167,36 @@ class parser:
                 output_file.write(info+"\n")
         return output_file_path
     
-    def parse_data(self,scraped_data_path: str):
-        scraped_data = self.open_file(scraped_data_path)
-        cleaned_data = self.clean_text(scraped_data)
-        filtered_info = self.filter_relevant_info(cleaned_data)
-        data = self.remove_incoherent_and_repetitive(filtered_info)
+    def iter_relevant_sentences(self, pages):
+        # Streaming variant of parse_data: cleans and filters every scraped
+        # page as soon as it arrives and yields the relevant sentences that
+        # have not been seen on an earlier page
+        deduper = Deduper()
+        for page in pages:
+            filtered_info = self.filter_segments(self.relevant_segments(page['content']))
+            yield from deduper.filter(filtered_info)
+            self.stats["dedupe"] = deduper.stats()
+
+    def parse_data(self,scraped_data_path: str, output_file_path: str = None):
+        if scraped_data_path.endswith(".jsonl"):
+            # Page records: filtered page by page, without the URL lines and
+            # separators of the text format, and duplicate pages read once.
+            # Read-only, so a missing file raises instead of being created
+            store = RecordStore(scraped_data_path, readonly=True)
+            try:
+                data = list(self.iter_relevant_sentences(store.iter_pages(skip_duplicates=True)))
+            finally:
+                store.close()
+        else:
+            scraped_data = self.open_file(scraped_data_path)
+            filtered_info = self.filter_segments(self.relevant_segments(scraped_data))
+            data = self.remove_incoherent_and_repetitive(filtered_info)
+        print(f"Parsed {self.stats['parsed_chars']} of {self.stats['cleaned_chars']} cleaned characters")
+        print(f"Removed sentences: {self.stats.get('dedupe', {}).get('removed', 0)}")
         # print(self.write_to_file(final_info))
-        current_path = os.getcwd()
-        output_file_path = os.path.join(current_path, "filtered_info.txt")
+        if output_file_path is None:
+            current_path = os.getcwd()
+            output_file_path = os.path.join(current_path, "filtered_info.txt")
         with open(output_file_path, "w", encoding="utf-8") as output_file:
             output_file.writelines(info + '\n' for info in data)
         return output_file_path
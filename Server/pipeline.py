@@ -0,0 +1,234 @@
+# pipeline.py
+import json
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from Scrapping_modules_init.main import iter_scrape, FetchStats
+from Scrapping_modules_init.record_store import RecordStore
+from Minor.NLP_backend.main import process_nlp_stream, render_sentences, render_svg_page, svg_index
+from Minor.NLP_backend.file_utils import save_to_csv
+from Minor.NLP_backend.visualization import svg_index_path, svg_page_path
+from workspace import Workspace, is_active, valid_run_id
+import parser
+
+# Items buffered between two stages; a full buffer blocks the producer,
+# which keeps memory bounded when a downstream stage is slower
+STAGE_BUFFER = int(os.environ.get("PIPELINE_STAGE_BUFFER", 32))
+# Sentences per nlp.pipe batch; small batches get the first rows out sooner
+STREAM_BATCH_SIZE = int(os.environ.get("PIPELINE_BATCH_SIZE", 16))
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+def run_in_thread(items, maxsize=STAGE_BUFFER, name=None):
+    # Consumes `items` on a background thread and yields them through a
+    # bounded queue, so the producing stage runs ahead of the consumer by at
+    # most `maxsize` items. Errors are re-raised on the consumer side.
+    buffer = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except Exception as e:
+            put(_Failed(e))
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def tee_to_file(items, path, format_item):
+    # Optional file sink: writes every item on its way through
+    with open(path, "w", encoding="utf-8") as file:
+        for item in items:
+            file.write(format_item(item))
+            yield item
+
+
+def tee_to_records(pages, path):
+    # Page sink: one record per page, readable page by page later on
+    store = RecordStore(path)
+    try:
+        for page in pages:
+            store.append_page(page)
+            yield page
+    finally:
+        store.close()
+
+
+def track(items, job, stage, unit, start_time):
+    # Reports per-stage progress on the job while items flow through
+    count = 0
+    for item in items:
+        count += 1
+        if count == 1:
+            job.update_stage(stage, first_item_seconds=round(time.perf_counter() - start_time, 3))
+        job.update_stage(stage, **{unit: count})
+        yield item
+    job.finish_stage(stage, **{unit: count})
+
+
+def stream_process(job, request, workspace):
+    """Runs scrape -> parse -> NLP as overlapping stages.
+
+    Every scraped page is cleaned and filtered as soon as it arrives, and the
+    relevant sentences are fed to NER while the crawl is still going. The
+    page records (dataset.jsonl) and filtered_info file are still written,
+    as side outputs.
+    """
+    start_time = time.perf_counter()
+    for stage in ("scrape", "parse", "nlp"):
+        job.start_stage(stage)
+
+    fetch_stats = FetchStats()
+    # Passing the crawl_id of an interrupted run resumes its crawl
+    crawl_id = request.crawl_id or workspace.run_id
+    job.update_stage("scrape", crawl_id=crawl_id)
+    pages = iter_scrape(request.query, request.keywords, fetch_stats, crawl_id)
+    pages = tee_to_records(pages, workspace.artifact("dataset.jsonl"))
+    pages = track(pages, job, "scrape", "pages", start_time)
+    pages = run_in_thread(pages, name="scrape")
+
+    parser_instance = parser.parser(request.keywords)
+    sentences = parser_instance.iter_relevant_sentences(pages)
+    sentences = tee_to_file(sentences, workspace.artifact("filtered_info.txt"), lambda s: s + "\n")
+    sentences = track(sentences, job, "parse", "sentences", start_time)
+    sentences = run_in_thread(sentences, name="parse")
+
+    rows = 0
+    def on_row(row):
+        nonlocal rows
+        rows += 1
+        if rows == 1:
+            job.update_stage("nlp", first_row_seconds=round(time.perf_counter() - start_time, 3))
+        job.update_stage("nlp", rows=rows)
+
+    nlp_stats = {}
+    svg_file, csv_file = process_nlp_stream(
+        sentences, request.columns_to_save,
+        csv_filename=workspace.artifact("structured_data.csv"),
+        svg_filename=workspace.artifact("relationships.svg"),
+        html_filename=workspace.artifact("entities_all_chunks.html"),
+        sentences_filename=workspace.artifact("sentences.jsonl"),
+        table_filename=workspace.artifact("table.csv"),
+        batch_size=STREAM_BATCH_SIZE, on_row=on_row, stats=nlp_stats)
+    job.update_stage("scrape", fetch_stats=fetch_stats.as_dict())
+    job.update_stage("parse", dedupe=parser_instance.stats.get("dedupe"))
+    job.finish_stage("nlp", rows=rows, **nlp_stats)
+    return svg_file, csv_file
+
+
+def cache_result(job, request, workspace, cache):
+    # Keeps the run's full table and sentences for later requests with the
+    # same query and keywords. Runs that found nothing are not cached, since
+    # that usually means the search or the crawl failed.
+    rows = job.stages["nlp"].get("rows", 0)
+    if not rows:
+        return None
+    return cache.put(request.query, request.keywords, workspace.artifact,
+                     run_id=workspace.run_id, rows=rows)
+
+
+def restore_cached(request, workspace, cache):
+    # Answers a request from the cache: the cached run's table is projected
+    # on columns_to_save, and its sentences are copied so that the
+    # visualizations can be rendered for this run as for any other.
+    # Returns (svg file, csv file, cache entry), or None on a miss.
+    entry = cache.restore(request.query, request.keywords, workspace.artifact)
+    if entry is None:
+        return None
+    # Read back as the strings they were written from, empty cells included
+    table = pd.read_csv(workspace.artifact("table.csv"), dtype=str, keep_default_na=False)
+    csv_file = workspace.artifact("structured_data.csv")
+    save_to_csv(table, csv_file, request.columns_to_save)
+    return workspace.artifact("relationships.svg"), csv_file, entry
+
+
+def render_run(run_id, style, start, count):
+    # Entity HTML or dependency SVG for a range of a run's sentences, or
+    # None if the run has no stored sentences (yet)
+    sentences_path = Workspace(run_id).artifact("sentences.jsonl")
+    if not os.path.exists(sentences_path + ".idx"):
+        return None
+    return render_sentences(sentences_path, style, start, count)
+
+
+def _svg_paths(filename):
+    # (svg path, sentences path) for <run_id>_relationships.svg, or None if
+    # the name is not such an artifact
+    run_id, _, name = filename.partition("_")
+    if name != "relationships.svg" or not valid_run_id(run_id):
+        return None
+    workspace = Workspace(run_id)
+    return workspace.artifact(name), workspace.artifact("sentences.jsonl")
+
+
+def _can_render(filename, sentences_path):
+    # Pages are rendered from the stored sentences once the run is over
+    run_id = filename.partition("_")[0]
+    return not is_active(run_id) and os.path.exists(sentences_path + ".idx")
+
+
+def svg_page_file(filename, page):
+    # Page `page` of a run's relationships SVG, rendered on its first
+    # request; None if there is no such page (yet)
+    paths = _svg_paths(filename)
+    if paths is None or page < 1:
+        return None
+    svg_path, sentences_path = paths
+    page_path = svg_page_path(svg_path, page)
+    if os.path.isfile(page_path):
+        return page_path
+    if not _can_render(filename, sentences_path):
+        return None
+    return render_svg_page(sentences_path, svg_path, page)
+
+
+def svg_page_index(filename):
+    # The run's SVG pages and the sentences on each, or None
+    paths = _svg_paths(filename)
+    if paths is None:
+        return None
+    svg_path, sentences_path = paths
+    index_path = svg_index_path(svg_path)
+    if os.path.isfile(index_path):
+        with open(index_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    if not _can_render(filename, sentences_path):
+        return None
+    return svg_index(sentences_path, svg_path)
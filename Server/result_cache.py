@@ -0,0 +1,193 @@
+# result_cache.py
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the index is then only locked per process
+    fcntl = None
+
+# Finished /process results, one directory per query under here; "" disables the cache
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", "result_cache")
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", 24 * 3600))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 20))
+# Run artifacts an entry keeps: the full entity table, and the sentences
+# the visualizations are rendered from
+CACHED_ARTIFACTS = ("table.csv", "sentences.jsonl", "sentences.jsonl.idx")
+
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def normalize_keywords(keywords):
+    # Keywords as the pipeline and the cache both use them: stripped, with
+    # blanks and repeats dropped, in their original order
+    normalized = []
+    for keyword in keywords:
+        keyword = str(keyword).strip()
+        if keyword and keyword not in normalized:
+            normalized.append(keyword)
+    return normalized
+
+
+def cache_key(query, keywords):
+    # The same query and keyword set give the same key, whatever the
+    # spacing of the query or the order and repeats of the keywords.
+    # Keywords are taken as they are: normalize_keywords them first
+    canonical = {"query": " ".join(query.split()), "keywords": sorted(set(keywords))}
+    return hashlib.sha256(json.dumps(canonical, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def valid_cache_key(key):
+    return bool(_KEY.match(key))
+
+
+class ResultCache:
+    """Results of finished runs, keyed by cache_key(query, keywords).
+
+    An entry holds the run's full structured table, with every entity
+    column, so any columns_to_save can be projected from it, plus the
+    stored sentences. Entries are served while younger than `ttl`; beyond
+    `max_entries` the least recently used ones are dropped. index.json
+    holds the entries' metadata, each entry's files live in <root>/<key>/.
+    """
+
+    def __init__(self, root=RESULT_CACHE_DIR, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES):
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(root, "index.json")
+
+    @contextmanager
+    def _locked(self):
+        # Several server processes may share the cache: the index is read,
+        # changed and written under an exclusive lock on index.lock
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, "index.lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _read(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        tmp_path = f"{self._index_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self._index_path)
+
+    def _drop(self, entries, key):
+        entries.pop(key, None)
+        shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+
+    def _fresh(self, entry, now):
+        return now - entry["created_at"] < self.ttl
+
+    def restore(self, query, keywords, destination):
+        # Copies a fresh entry's artifacts to destination(name) and returns
+        # its metadata, or returns None on a miss
+        key = cache_key(query, keywords)
+        with self._locked():
+            entries = self._read()
+            entry = entries.get(key)
+            now = time.time()
+            if entry is None or not self._fresh(entry, now):
+                if entry is not None:
+                    self._drop(entries, key)
+                    self._write(entries)
+                self.misses += 1
+                return None
+            # Copied under the lock, so eviction cannot remove them halfway
+            try:
+                for name in CACHED_ARTIFACTS:
+                    shutil.copyfile(os.path.join(self.root, key, name), destination(name))
+            except FileNotFoundError:
+                # The entry's files are gone (deleted by hand, say): a miss
+                self._drop(entries, key)
+                self._write(entries)
+                self.misses += 1
+                return None
+            entry["last_used"] = now
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._write(entries)
+            self.hits += 1
+            return dict(entry, key=key)
+
+    def put(self, query, keywords, source, **info):
+        # Stores the artifacts at source(name) for this query; the oldest
+        # entries are evicted past max_entries
+        key = cache_key(query, keywords)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f"{key}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(tmp_path)
+        try:
+            for name in CACHED_ARTIFACTS:
+                shutil.copyfile(source(name), os.path.join(tmp_path, name))
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        with self._locked():
+            entries = self._read()
+            self._drop(entries, key)
+            os.rename(tmp_path, os.path.join(self.root, key))
+            now = time.time()
+            entries[key] = dict(info, query=query, keywords=list(keywords),
+                                created_at=now, last_used=now, hits=0)
+            for old_key in [k for k, e in entries.items() if not self._fresh(e, now)]:
+                self._drop(entries, old_key)
+            by_use = sorted(entries, key=lambda k: entries[k]["last_used"])
+            for old_key in by_use[:max(0, len(entries) - self.max_entries)]:
+                self._drop(entries, old_key)
+            self._write(entries)
+        return key
+
+    def invalidate(self, key):
+        # Returns False if there was no such entry
+        with self._locked():
+            entries = self._read()
+            if key not in entries:
+                return False
+            self._drop(entries, key)
+            self._write(entries)
+            return True
+
+    def clear(self):
+        with self._locked():
+            entries = self._read()
+            cleared = len(entries)
+            for key in list(entries):
+                self._drop(entries, key)
+            self._write(entries)
+            return cleared
+
+    def stats(self):
+        with self._locked():
+            entries = self._read()
+        now = time.time()
+        return {
+            "entries": len(entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": [{"key": key, "query": entry["query"], "keywords": entry["keywords"],
+                        "rows": entry.get("rows"), "hits": entry.get("hits", 0),
+                        "age_seconds": round(now - entry["created_at"], 1), "fresh": self._fresh(entry, now)}
+                       for key, entry in entries.items()],
+        }
@@ -0,0 +1,39 @@
+import unittest
+
+from dedupe import Deduper, MinHashLSH, lsh_params
+
+
+class DedupeTest(unittest.TestCase):
+    def test_passes_keep_first_occurrence_order(self):
+        sentences = [
+            "Apple reported record revenue for the holiday quarter",
+            "Too short",
+            "The iPhone remained the largest product line this year",
+            "Apple reported record revenue for the holiday quarter",
+            "Apple reported record revenue for the holiday quarter again",
+            "Analysts expect the stock price to rise next month",
+        ]
+        deduper = Deduper(threshold=0.7)
+        kept = list(deduper.filter(sentences))
+        self.assertEqual(kept, [sentences[0], sentences[2], sentences[5]])
+        self.assertEqual(deduper.stats()["removed"],
+                         {"exact": 1, "incoherent": 1, "near_duplicate": 1})
+
+    def test_threshold_one_disables_near_duplicates(self):
+        deduper = Deduper(threshold=1)
+        kept = list(deduper.filter(["one two three four five", "one two three four five six"]))
+        self.assertEqual(len(kept), 2)
+
+    def test_distinct_sentences_survive(self):
+        index = MinHashLSH(threshold=0.8)
+        sentences = [f"sentence number {i} talks about topic {i * 7} in detail" for i in range(2000)]
+        self.assertTrue(all(index.add(sentence) for sentence in sentences))
+        self.assertFalse(index.add(sentences[10]))
+
+    def test_lsh_params_cover_permutations(self):
+        bands, rows = lsh_params(0.8, 64)
+        self.assertEqual(bands * rows, 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from result_cache import CACHED_ARTIFACTS, ResultCache, cache_key, normalize_keywords
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.dir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_files(self, name, text):
+        # Artifacts of a finished run, as workspace.artifact names them
+        os.makedirs(os.path.join(self.dir, name), exist_ok=True)
+        artifact = lambda artifact_name: os.path.join(self.dir, name, artifact_name)
+        for artifact_name in CACHED_ARTIFACTS:
+            with open(artifact(artifact_name), "w", encoding="utf-8") as file:
+                file.write(text)
+        return artifact
+
+    def test_key_ignores_spacing_order_and_repeats(self):
+        self.assertEqual(cache_key(" apple  news", ["b", "a", "a"]), cache_key("apple news", ["a", "b"]))
+        self.assertNotEqual(cache_key("apple news", ["a"]), cache_key("apple news", ["a", "b"]))
+        # Spacing inside keywords matters to the pipeline, so it does to the key
+        self.assertNotEqual(cache_key("q", ["a "]), cache_key("q", ["a"]))
+
+    def test_normalize_keywords(self):
+        self.assertEqual(normalize_keywords([" b", "a", "", "  ", "b ", "a"]), ["b", "a"])
+
+    def test_restore_copies_the_stored_run(self):
+        cache = ResultCache(self.root)
+        self.assertIsNone(cache.restore("q", ["a"], self.run_files("miss", "")))
+        cache.put("q", ["a", "b"], self.run_files("first", "table"), run_id="first", rows=3)
+        destination = self.run_files("second", "")
+        entry = cache.restore("q", ["b", "a"], destination)
+        self.assertEqual((entry["run_id"], entry["rows"]), ("first", 3))
+        with open(destination("table.csv"), "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "table")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_entry_without_files_is_a_miss(self):
+        cache = ResultCache(self.root)
+        key = cache.put("q", ["a"], self.run_files("run", "table"))
+        shutil.rmtree(os.path.join(self.root, key))
+        self.assertIsNone(cache.restore("q", ["a"], self.run_files("other", "")))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_expired_entries_are_not_served(self):
+        cache = ResultCache(self.root, ttl=0)
+        cache.put("q", ["a"], self.run_files("run", "table"))
+        self.assertIsNone(cache.restore("q", ["a"], self.run_files("other", "")))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResultCache(self.root, max_entries=2)
+        key_a = cache.put("a", [], self.run_files("a", "a"))
+        key_b = cache.put("b", [], self.run_files("b", "b"))
+        cache.restore("a", [], self.run_files("other", ""))
+        cache.put("c", [], self.run_files("c", "c"))
+        keys = [entry["key"] for entry in cache.stats()["cached"]]
+        self.assertEqual(sorted(keys), sorted([key_a, cache_key("c", [])]))
+        self.assertFalse(os.path.exists(os.path.join(self.root, key_b)))
+
+    def test_invalidate_and_clear(self):
+        cache = ResultCache(self.root)
+        key = cache.put("a", [], self.run_files("a", "a"))
+        cache.put("b", [], self.run_files("b", "b"))
+        self.assertTrue(cache.invalidate(key))
+        self.assertFalse(cache.invalidate(key))
+        self.assertEqual(cache.clear(), 1)
+        self.assertEqual(sorted(os.listdir(self.root)), ["index.json", "index.lock"])
+
+
+if __name__ == "__main__":
+    unittest.main()
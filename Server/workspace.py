@@ -0,0 +1,86 @@
+# workspace.py
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+# Every /process run writes its artifacts into its own directory under here
+WORKSPACE_ROOT = os.environ.get("WORKSPACE_ROOT", "workspaces")
+WORKSPACE_RETENTION_SECONDS = int(os.environ.get("WORKSPACE_RETENTION_SECONDS", 24 * 3600))
+WORKSPACE_MAX_COUNT = int(os.environ.get("WORKSPACE_MAX_COUNT", 50))
+
+_RUN_ID = re.compile(r"^[0-9a-f]{32}$")
+_active = set()
+_lock = threading.Lock()
+
+
+class Workspace:
+    def __init__(self, run_id, root=WORKSPACE_ROOT):
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+
+    def artifact(self, name):
+        # Artifact names carry the run id, so they are unique across runs
+        return os.path.join(self.path, f"{self.run_id}_{name}")
+
+    def release(self):
+        # Finished runs become eligible for garbage collection
+        with _lock:
+            _active.discard(self.run_id)
+        os.utime(self.path)
+
+
+def create_workspace(root=WORKSPACE_ROOT):
+    gc_workspaces(root)
+    workspace = Workspace(uuid.uuid4().hex, root)
+    os.makedirs(workspace.path)
+    with _lock:
+        _active.add(workspace.run_id)
+    return workspace
+
+
+def valid_run_id(run_id):
+    # Run (and crawl) ids name directories: only uuid4 hex strings pass
+    return bool(_RUN_ID.match(run_id))
+
+
+def is_active(run_id):
+    # True while the run that owns the workspace is still going
+    with _lock:
+        return run_id in _active
+
+
+def resolve_artifact(filename, root=WORKSPACE_ROOT):
+    # Map an artifact name back to its workspace; returns None for names
+    # that do not belong to a run (including any path tricks)
+    run_id = filename.split("_", 1)[0]
+    if not valid_run_id(run_id) or os.path.basename(filename) != filename:
+        return None
+    path = os.path.join(root, run_id, filename)
+    return path if os.path.isfile(path) else None
+
+
+def gc_workspaces(root=WORKSPACE_ROOT, retention=WORKSPACE_RETENTION_SECONDS,
+                  max_count=WORKSPACE_MAX_COUNT):
+    # Delete workspaces older than the retention period, then the oldest
+    # ones beyond max_count. Workspaces of running jobs are never touched.
+    if not os.path.isdir(root):
+        return []
+    with _lock:
+        active = set(_active)
+    entries = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if _RUN_ID.match(name) and name not in active and os.path.isdir(path):
+            entries.append((os.path.getmtime(path), path))
+    entries.sort()
+
+    now = time.time()
+    expired = [path for mtime, path in entries if now - mtime > retention]
+    kept = [path for mtime, path in entries if now - mtime <= retention]
+    expired += kept[:max(0, len(kept) - max_count)]
+    for path in expired:
+        shutil.rmtree(path, ignore_errors=True)
+    return expired